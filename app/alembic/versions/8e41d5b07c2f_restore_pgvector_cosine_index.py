@@ -0,0 +1,28 @@
+"""Restore pgvector cosine index
+
+Revision ID: 8e41d5b07c2f
+Revises: 3b8f2c41a9d7
+Create Date: 2026-10-17 11:02:47.861390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e41d5b07c2f'
+down_revision: Union[str, None] = '3b8f2c41a9d7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Created in d7fca6a4dce3 but dropped again by the autogenerated e291f22949de,
+    # since the model did not declare it. It is declared on FaceEmbedding now.
+    op.create_index('face_embedding_cosine_idx', 'face_embeddings', ['embedding'], unique=False, postgresql_using='ivfflat', postgresql_with={'lists': 100}, postgresql_ops={'embedding': 'vector_cosine_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('face_embedding_cosine_idx', table_name='face_embeddings', postgresql_using='ivfflat', postgresql_with={'lists': 100})
@@ -0,0 +1,67 @@
+"""Per-seat vs whole-frame edge density.
+
+Run from the repository root:
+    python -m app.benchmarks.edge_density [repeats]
+"""
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from app.config import settings
+from app.core.image_processing import (edge_density_batch, edge_detection_roi,
+                                       orb_align_image)
+from app.core.seat_labels import bounding_boxes
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_FRAMES = [os.path.join(BASE_DIR, f"static/{i}.png") for i in range(1, 8)]
+
+def per_roi_edge_density(aligned_filled_gray):
+    edge_means = {}
+    for label, (x, y, w, h) in bounding_boxes.items():
+        region = aligned_filled_gray[y:y+h, x:x+w]
+        edge_means[label] = np.mean(edge_detection_roi(region, 0, 0, w, h))
+    return edge_means
+
+def time_call(fn, *args, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = fn(*args)
+    return (time.perf_counter() - start) / repeats, result
+
+def main(repeats: int = 20):
+    empty_gray = cv2.imread(os.path.join(BASE_DIR, "static/empty-auditorium.png"), cv2.IMREAD_GRAYSCALE)
+
+    roi_total = batch_total = 0.0
+    diffs, flips, seats = [], 0, 0
+
+    print(f"{'frame':<8}{'per-roi ms':>12}{'batch ms':>12}{'max diff':>10}{'flips':>7}")
+    for path in SAMPLE_FRAMES:
+        aligned = orb_align_image(empty_gray, cv2.imread(path, cv2.IMREAD_GRAYSCALE))
+
+        roi_time, roi_means = time_call(per_roi_edge_density, aligned, repeats=repeats)
+        batch_time, batch_means = time_call(edge_density_batch, aligned, bounding_boxes, repeats=repeats)
+
+        frame_diffs = [abs(roi_means[label] - batch_means[label]) for label in bounding_boxes]
+        frame_flips = sum(
+            (roi_means[label] > settings.edge_threshold) != (batch_means[label] > settings.edge_threshold)
+            for label in bounding_boxes
+        )
+
+        roi_total += roi_time
+        batch_total += batch_time
+        diffs.extend(frame_diffs)
+        flips += frame_flips
+        seats += len(bounding_boxes)
+
+        print(f"{os.path.basename(path):<8}{roi_time * 1000:>12.2f}{batch_time * 1000:>12.2f}"
+              f"{max(frame_diffs):>10.2f}{frame_flips:>7}")
+
+    print(f"\nspeedup: {roi_total / batch_total:.2f}x")
+    print(f"edge mean difference: mean {np.mean(diffs):.2f}, max {np.max(diffs):.2f}")
+    print(f"edge decisions flipped: {flips}/{seats}")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,55 @@
+"""Latency of concurrent face encoding requests, with and without batching.
+
+Run from the repository root with a photo containing one face:
+    python -m app.benchmarks.face_batching path/to/photo.jpg [requests] [rounds] [window_ms]
+
+Fires `requests` encodings at once, `rounds` times, for batching disabled and
+for a `window_ms` batch window (default 5) with FACE_BATCH_SIZE, and reports
+throughput and p50/p95/p99 latency per request.
+"""
+import asyncio
+import sys
+import time
+
+import numpy as np
+
+from app.config import settings
+from app.services import face_inference
+from app.services.face_inference import FaceBatcher, encode_faces
+
+async def timed_encode(image_file: bytes) -> float:
+    start = time.perf_counter()
+    await encode_faces(image_file)
+    return time.perf_counter() - start
+
+async def run(image_file: bytes, requests: int, rounds: int, window: float, max_size: int):
+    face_inference.face_batcher = FaceBatcher(window, max_size)
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(rounds):
+        latencies.extend(await asyncio.gather(*(timed_encode(image_file) for _ in range(requests))))
+    elapsed = time.perf_counter() - start
+
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    label = f"window {window * 1000:g} ms, size {max_size}" if window > 0 else "no batching"
+    print(f"{label:<26}{len(latencies) / elapsed:>10.1f}{p50:>10.0f}{p95:>10.0f}{p99:>10.0f}")
+
+async def main(path: str, requests: int = 32, rounds: int = 5, window_ms: int = 5):
+    with open(path, "rb") as f:
+        image_file = f.read()
+
+    # Admit everything; this measures latency, not load shedding
+    settings.face_queue_size = requests
+    face_inference.start_face_executor()
+    await encode_faces(image_file)  # warm up the workers
+
+    print(f"{'':<26}{'img/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    try:
+        await run(image_file, requests, rounds, 0, 1)
+        await run(image_file, requests, rounds, window_ms / 1000, settings.face_batch_size)
+    finally:
+        face_inference.stop_face_executor()
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    asyncio.run(main(args[0], *(int(arg) for arg in args[1:4])))
@@ -0,0 +1,87 @@
+"""Face encoding on full-resolution uploads vs the downscale-and-crop path.
+
+Run from the repository root against a directory with one subdirectory of
+photos per person:
+    python -m app.benchmarks.face_prep path/to/faces [tolerance]
+
+Reports CPU time and peak memory per image for both paths (memory as traced
+by tracemalloc, i.e. image buffers but not dlib's own allocations), how far the
+two paths' encodings of the same photo are apart, and verification accuracy
+(every pair of photos, same person should match, different people should not)
+for each path at the given tolerance.
+"""
+import io
+import itertools
+import os
+import sys
+import time
+import tracemalloc
+
+import face_recognition
+import numpy as np
+
+from app.services.face_inference import face_encodings_from_upload
+
+def full_resolution_encodings(image_file: bytes) -> list[np.ndarray]:
+    image = face_recognition.load_image_file(io.BytesIO(image_file))
+    return face_recognition.face_encodings(image)
+
+def measure(fn, image_file: bytes):
+    tracemalloc.start()
+    start = time.process_time()
+    encodings = fn(image_file)
+    elapsed = time.process_time() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return encodings, elapsed, peak
+
+def verification_accuracy(people: list[str], encodings: list[np.ndarray], tolerance: float) -> float:
+    pairs = [
+        (face_recognition.face_distance([a], b)[0] <= tolerance) == (person_a == person_b)
+        for (person_a, a), (person_b, b) in itertools.combinations(zip(people, encodings), 2)
+    ]
+    return sum(pairs) / len(pairs) if pairs else 0.0
+
+def main(faces_dir: str, tolerance: float = 0.6):
+    people, full, prepped = [], [], []
+    full_time = prep_time = 0.0
+    full_peak = prep_peak = 0
+    missed = {"full": 0, "prep": 0}
+
+    print(f"{'photo':<32}{'full ms':>9}{'prep ms':>9}{'full MB':>9}{'prep MB':>9}{'distance':>10}")
+    for person in sorted(os.listdir(faces_dir)):
+        person_dir = os.path.join(faces_dir, person)
+        if not os.path.isdir(person_dir):
+            continue
+        for name in sorted(os.listdir(person_dir)):
+            with open(os.path.join(person_dir, name), "rb") as f:
+                image_file = f.read()
+
+            full_encodings, full_elapsed, full_bytes = measure(full_resolution_encodings, image_file)
+            prep_encodings, prep_elapsed, prep_bytes = measure(face_encodings_from_upload, image_file)
+            full_time += full_elapsed
+            prep_time += prep_elapsed
+            full_peak = max(full_peak, full_bytes)
+            prep_peak = max(prep_peak, prep_bytes)
+
+            missed["full"] += not full_encodings
+            missed["prep"] += not prep_encodings
+            distance = ""
+            if full_encodings and prep_encodings:
+                distance = f"{face_recognition.face_distance([full_encodings[0]], prep_encodings[0])[0]:.3f}"
+                people.append(person)
+                full.append(full_encodings[0])
+                prepped.append(prep_encodings[0])
+
+            print(f"{person + '/' + name:<32}{full_elapsed * 1000:>9.0f}{prep_elapsed * 1000:>9.0f}"
+                  f"{full_bytes / 2**20:>9.1f}{prep_bytes / 2**20:>9.1f}{distance:>10}")
+
+    print(f"\nCPU time: {full_time:.2f}s full resolution, {prep_time:.2f}s prepared")
+    print(f"peak memory: {full_peak / 2**20:.1f} MB full resolution, {prep_peak / 2**20:.1f} MB prepared")
+    print(f"no face found: {missed['full']} full resolution, {missed['prep']} prepared")
+    print(f"verification accuracy at tolerance {tolerance}: "
+          f"{verification_accuracy(people, full, tolerance):.2%} full resolution, "
+          f"{verification_accuracy(people, prepped, tolerance):.2%} prepared")
+
+if __name__ == "__main__":
+    main(sys.argv[1], float(sys.argv[2]) if len(sys.argv) > 2 else 0.6)
@@ -0,0 +1,226 @@
+"""End-to-end occupancy pipeline: per-stage latency, throughput, peak memory and
+seat-level agreement with the golden frames.
+
+Run from the repository root:
+    python -m app.benchmarks.occupancy [--repeats N] [--video-frames N] [--update-expected]
+
+Stages follow the configured settings (ALIGN_DOWNSCALE and friends), so the
+same command compares configurations. The alignment table shows how far the
+configured homography moves each seat centre compared to a full-resolution
+estimate.
+
+The expected occupancy in expected_occupancy.json is the pipeline's own output
+for the sample stills, checked in so that speed work which silently changes seat
+decisions shows up as disagreement here. Regenerate it with --update-expected
+only when a change in decisions is intended.
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from app.config import settings
+from app.core.hall_config import get_hall
+from app.core.image_processing import orb_homography, warp_to_source
+from app.services.occupancy_detection import (HallDetector,
+                                              create_homography_estimator,
+                                              seat_edge_means,
+                                              seat_ssim_scores)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GOLDEN_FRAMES = [os.path.join(BASE_DIR, f"static/{i}.png") for i in range(1, 8)]
+GOLDEN_FRAMES.append(os.path.join(BASE_DIR, "static/empty-auditorium.png"))
+EXPECTED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "expected_occupancy.json")
+STAGES = ["load", "orb", "homography", "warp", "edges", "ssim", "grouping"]
+
+def run_stages(path_or_frame, detector: HallDetector, timings: dict[str, list[float]]) -> dict[str, int]:
+    """One full (non-incremental) pass over a frame, timing every stage."""
+    scene = detector.reference_scene.get()
+    hall = detector.hall
+
+    start = time.perf_counter()
+    if isinstance(path_or_frame, str):
+        filled_gray = cv2.imread(path_or_frame, cv2.IMREAD_GRAYSCALE)
+    else:
+        filled_gray = cv2.cvtColor(path_or_frame, cv2.COLOR_BGR2GRAY)
+    lap = time.perf_counter()
+    timings["load"].append(lap - start)
+
+    # ORB on the target at the estimation level, then matching and RANSAC (plus
+    # any full-resolution refinement, which brings its own ORB pass)
+    estimator = detector.homography_estimator
+    start, target_level = lap, estimator.target_features(filled_gray)
+    lap = time.perf_counter()
+    timings["orb"].append(lap - start)
+
+    start, matrix = lap, estimator.match(scene.gray, filled_gray, target_level, scene.features)
+    lap = time.perf_counter()
+    timings["homography"].append(lap - start)
+
+    start, aligned = lap, warp_to_source(scene.gray, filled_gray, matrix)
+    lap = time.perf_counter()
+    timings["warp"].append(lap - start)
+
+    start, edge_means = lap, seat_edge_means(aligned, detector.bounding_boxes)
+    lap = time.perf_counter()
+    timings["edges"].append(lap - start)
+
+    start = lap
+    candidates = {
+        label: detector.bounding_boxes[label]
+        for label, edge_mean in edge_means.items() if edge_mean > hall.edge_threshold
+    }
+    ssim_scores = seat_ssim_scores(scene.gray, aligned, candidates)
+    occupancy = {label: 0 for label in detector.bounding_boxes}
+    for label, score in ssim_scores.items():
+        if score < hall.ssim_threshold:
+            occupancy[label] = 1
+    lap = time.perf_counter()
+    timings["ssim"].append(lap - start)
+
+    start = lap
+    detector.layout.group(occupancy)
+    timings["grouping"].append(time.perf_counter() - start)
+
+    return occupancy
+
+def seat_displacement(matrix: np.ndarray, reference: np.ndarray, boxes: np.ndarray) -> float:
+    """Largest distance, in pixels, between where two homographies put a seat centre."""
+    centres = (boxes[:, :2] + boxes[:, 2:] / 2).astype(np.float32).reshape(-1, 1, 2)
+    reference_inverse = np.linalg.inv(reference)
+    moved = cv2.perspectiveTransform(centres, reference_inverse)
+    return float(np.abs(cv2.perspectiveTransform(moved, matrix) - centres).max())
+
+def alignment_accuracy(detector: HallDetector, inputs: list):
+    # Matrices map frame points to reference points, so seat centres (in the
+    # reference) are taken to the frame by the full-resolution matrix and back
+    # with the configured one
+    scene = detector.reference_scene.get()
+    estimator = create_homography_estimator()
+
+    print(f"\n{'frame':<22}{'full ms':>9}{'config ms':>11}{'seat px':>9}")
+    full_total = config_total = 0.0
+    displacements = []
+    for name, source in inputs:
+        filled_gray = (cv2.imread(source, cv2.IMREAD_GRAYSCALE) if isinstance(source, str)
+                       else cv2.cvtColor(source, cv2.COLOR_BGR2GRAY))
+        start = time.perf_counter()
+        reference = orb_homography(scene.gray, filled_gray, scene.features)
+        lap = time.perf_counter()
+        matrix = estimator.estimate(scene.gray, filled_gray, scene.features)
+        end = time.perf_counter()
+
+        displacement = seat_displacement(matrix, reference, detector.layout.boxes)
+        full_total += lap - start
+        config_total += end - lap
+        displacements.append(displacement)
+        print(f"{name:<22}{(lap - start) * 1000:>9.1f}{(end - lap) * 1000:>11.1f}{displacement:>9.2f}")
+
+    print(f"alignment speedup: {full_total / config_total:.2f}x, "
+          f"seat centre displacement mean {np.mean(displacements):.2f} px, max {np.max(displacements):.2f} px, "
+          f"re-estimated at full resolution for {estimator.refinements}/{estimator.estimations} frames")
+
+def sample_video(video_path: str, count: int) -> list[np.ndarray]:
+    cap = cv2.VideoCapture(video_path)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    frames = []
+    if cap.isOpened() and total > 0:
+        for index in np.linspace(0, total - 1, num=min(count, total), dtype=int):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(index))
+            ret, frame = cap.read()
+            if ret:
+                frames.append(frame)
+    cap.release()
+    return frames
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+def agreement(results: dict[str, dict[str, int]], expected: dict[str, dict[str, int]]):
+    print(f"\n{'frame':<22}{'seats':>7}{'agree':>7}{'flips':>7}")
+    total = mismatched = 0
+    for name, occupancy in results.items():
+        if name not in expected:
+            print(f"{name:<22}{'no expected occupancy':>21}")
+            continue
+        flips = sum(occupancy.get(label) != value for label, value in expected[name].items())
+        total += len(expected[name])
+        mismatched += flips
+        print(f"{name:<22}{len(expected[name]):>7}{1 - flips / len(expected[name]):>7.1%}{flips:>7}")
+    if total:
+        print(f"seat-level agreement: {1 - mismatched / total:.2%} ({mismatched}/{total} seats differ)")
+    return mismatched
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=5, help="passes over every frame")
+    parser.add_argument("--video-frames", type=int, default=20,
+                        help="frames sampled from the hall video, if it exists")
+    parser.add_argument("--hall", default=settings.default_hall_id)
+    parser.add_argument("--update-expected", action="store_true",
+                        help="write this run's occupancy as the new golden output")
+    args = parser.parse_args(argv)
+
+    hall = get_hall(args.hall)
+    detector = HallDetector(hall)
+    detector.reference_scene.get()
+
+    inputs = [(os.path.basename(path), path) for path in GOLDEN_FRAMES]
+    video_path = hall.resolve(hall.video_path)
+    if os.path.exists(video_path):
+        frames = sample_video(video_path, args.video_frames)
+        inputs.extend((f"video[{i}]", frame) for i, frame in enumerate(frames))
+    else:
+        print(f"{video_path} not found, benchmarking the still frames only")
+
+    timings = {stage: [] for stage in STAGES}
+    results: dict[str, dict[str, int]] = {}
+    start = time.perf_counter()
+    for _ in range(args.repeats):
+        for name, source in inputs:
+            results[name] = run_stages(source, detector, timings)
+    staged_elapsed = time.perf_counter() - start
+
+    # The service path: cached reference, homography reuse and incremental scoring
+    frames = [cv2.imread(source, cv2.IMREAD_GRAYSCALE) if isinstance(source, str)
+              else cv2.cvtColor(source, cv2.COLOR_BGR2GRAY) for _, source in inputs]
+    start = time.perf_counter()
+    for _ in range(args.repeats):
+        for frame in frames:
+            detector.detect(frame)
+    detector_elapsed = time.perf_counter() - start
+    processed = args.repeats * len(inputs)
+
+    print(f"\n{'stage':<12}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'share':>8}")
+    stage_total = sum(sum(values) for values in timings.values())
+    for stage, values in timings.items():
+        values_ms = np.array(values) * 1000
+        print(f"{stage:<12}{values_ms.mean():>10.2f}{np.percentile(values_ms, 50):>10.2f}"
+              f"{np.percentile(values_ms, 95):>10.2f}{sum(values) / stage_total:>8.1%}")
+
+    alignment_accuracy(detector, inputs)
+
+    print(f"\nfull pipeline: {processed / staged_elapsed:.2f} fps")
+    print(f"hall detector (homography reuse, incremental scoring): {processed / detector_elapsed:.2f} fps")
+    print(f"peak RSS: {peak_rss_mb():.1f} MB")
+
+    golden = {name: occupancy for name, occupancy in results.items() if not name.startswith("video")}
+    if args.update_expected:
+        with open(EXPECTED_PATH, "w") as f:
+            json.dump(golden, f, indent=2, sort_keys=True)
+        print(f"\nwrote expected occupancy for {len(golden)} frames to {EXPECTED_PATH}")
+        return 0
+
+    with open(EXPECTED_PATH) as f:
+        expected = json.load(f)
+    return 1 if agreement(golden, expected) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -24,5 +24,44 @@ class Settings(BaseSettings):
     radius: float = 100
     ssim_threshold: float = 0.45
     edge_threshold: float = 15
+    whole_frame_edges: bool = False  # one Canny pass for all seats, see edge_density_batch
+    ssim_batch_min_seats: int = 96  # edge-test candidates before switching to batched SSIM
+    default_hall_id: str = "main"
+    halls_config_path: str = "static/halls.json"
+    occupancy_workers: int = os.cpu_count() or 1
+    analysis_fps: float = 0.5  # frames analysed per second of source video
+    sampler_seek_threshold_frames: int = 250  # seek instead of grab() when further behind
+    seat_change_threshold: float = 6.0  # mean abs pixel change before a seat is re-scored
+    full_rescore_interval: int = 30  # analyses between full re-scores of every seat
+    ws_queue_size: int = 16  # outbound messages buffered per websocket client
+    ws_send_timeout: float = 5.0
+    ws_max_full_strikes: int = 3  # times a client's queue may overflow before eviction
+    occupancy_bus: str = "none"  # "none", "local" or "postgres" to share detection across workers
+    occupancy_bus_socket: str = "/tmp/seat-sense-occupancy.sock"
+    occupancy_bus_retry_interval: float = 2.0
+    occupancy_bus_resync_interval: float = 30.0
+    shared_occupancy: bool = False  # mirror occupancy into shared memory for other processes
+    shared_occupancy_prefix: str = "seat-sense"
+    reuse_homography: bool = True
+    homography_drift_threshold: float = 1.0  # camera shift in pixels before re-estimating
+    align_downscale: int = 2  # estimate the homography on a downscaled frame; 1 for full resolution
+    align_features: int = 1000  # ORB features at the downscaled level
+    align_min_inlier_ratio: float = 0.5  # below this share of inliers, re-estimate at full resolution
+    align_min_inliers: int = 50
+    align_matcher: str = "bf"  # "bf" (cross-check), "knn" or "flann" (LSH), both with a ratio test
+    align_match_ratio: float = 0.75
+    align_max_matches: int = 0  # keep only the best matches; 0 keeps all
+    face_workers: int = os.cpu_count() or 1  # processes encoding uploaded faces
+    face_queue_size: int = 32  # encoding jobs allowed to wait before requests get 429
+    face_decode_max_side: int = 1600  # uploads are decoded no larger than this
+    face_detect_max_side: int = 800  # faces are searched for on a copy this size
+    face_detect_upsample: int = 1
+    face_identify_detect_max_side: int = 1920  # kiosk frames, where distant faces are small
+    face_crop_margin: float = 0.5  # context kept around each face for encoding, in face sizes
+    face_batch_window_ms: float = 0.0  # how long a face encoding batch stays open; 0 disables batching
+    face_batch_size: int = 8
+    face_match_tolerance: float = 0.6  # largest embedding distance that counts as the same face
+    face_ivfflat_probes: int = 10  # IVFFlat lists searched per face in 1:N identification
+    face_identify_candidates: int = 5  # nearest embeddings re-checked against the tolerance
 
 settings = Settings()
\ No newline at end of file
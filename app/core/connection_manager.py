@@ -1,21 +1,113 @@
+import asyncio
+from typing import Callable
+
 from fastapi import WebSocket
+from fastapi.logger import logger
+
+from app.config import settings
+from app.core.metrics import Gauge, registry, stage_seconds
+
+class ClientConnection:
+    """A websocket with its own bounded outbound queue, drained by its own sender task."""
+
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue[str | bytes] = asyncio.Queue(maxsize=queue_size)
+        self.full_strikes = 0
+        self.sender: asyncio.Task = None
 
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: list[WebSocket] = []
+        self.active_connections: dict[WebSocket, ClientConnection] = {}
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        client = ClientConnection(websocket, settings.ws_queue_size)
+        client.sender = asyncio.create_task(self._send_loop(client))
+        self.active_connections[websocket] = client
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        client = self.active_connections.pop(websocket, None)
+        if client is not None:
+            client.sender.cancel()
+
+    async def send_personal_message(self, message: str | bytes, websocket: WebSocket):
+        # Goes through the client's queue so it stays ordered with broadcasts
+        client = self.active_connections.get(websocket)
+        if client is not None:
+            self._enqueue(client, message)
+
+    async def broadcast(self, message: str | bytes, snapshot: Callable[[], str | bytes] = None):
+        # Only enqueues, so a slow client never holds up the others. When a client's
+        # queue is full its stale messages are replaced by `snapshot()`, if given.
+        with stage_seconds.time("broadcast"):
+            for client in list(self.active_connections.values()):
+                self._enqueue(client, message, snapshot)
+
+    def _enqueue(self, client: ClientConnection, message: str | bytes, snapshot: Callable[[], str | bytes] = None):
+        try:
+            client.queue.put_nowait(message)
+            return
+        except asyncio.QueueFull:
+            client.full_strikes += 1
+
+        if client.full_strikes >= settings.ws_max_full_strikes:
+            logger.warning("Evicting websocket client that stopped reading")
+            self._evict(client)
+            return
+
+        if snapshot is not None:
+            # Coalesce: everything queued is superseded by one fresh snapshot
+            while not client.queue.empty():
+                client.queue.get_nowait()
+            client.queue.put_nowait(snapshot())
+
+    async def _send_loop(self, client: ClientConnection):
+        try:
+            while True:
+                message = await client.queue.get()
+                if isinstance(message, bytes):
+                    send = client.websocket.send_bytes(message)
+                else:
+                    send = client.websocket.send_text(message)
+                await asyncio.wait_for(send, settings.ws_send_timeout)
+                client.full_strikes = 0
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error sending to websocket client: {e}")
+            self._evict(client)
+
+    def _evict(self, client: ClientConnection):
+        if self.active_connections.get(client.websocket) is client:
+            del self.active_connections[client.websocket]
+        client.sender.cancel()
+        asyncio.create_task(self._close(client.websocket))
+
+    async def _close(self, websocket: WebSocket):
+        try:
+            await asyncio.wait_for(websocket.close(), settings.ws_send_timeout)
+        except Exception:
+            pass
+
+manager = ConnectionManager()
 
-    async def send_personal_message(self, message: str, websocket: WebSocket):
-        await websocket.send_text(message)
+# One manager per hall and payload format, so clients only receive occupancy for
+# the hall they watch, encoded the way they asked for
+managers: dict[tuple[str, str], ConnectionManager] = {(settings.default_hall_id, "json"): manager}
 
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            await connection.send_text(message)
+def get_manager(hall_id: str = None, format: str = "json") -> ConnectionManager:
+    key = (hall_id or settings.default_hall_id, format)
+    if key not in managers:
+        managers[key] = ConnectionManager()
+    return managers[key]
 
-manager = ConnectionManager()
\ No newline at end of file
+registry.register(Gauge(
+    "seat_sense_websocket_clients", "Connected websocket clients.", ("hall", "format"),
+    lambda: [(key, len(m.active_connections)) for key, m in managers.items()],
+))
+registry.register(Gauge(
+    "seat_sense_websocket_queue_depth", "Messages waiting in websocket client queues.", ("hall", "format"),
+    lambda: [(key, sum(client.queue.qsize() for client in m.active_connections.values()))
+             for key, m in managers.items()],
+))
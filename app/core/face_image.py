@@ -0,0 +1,48 @@
+import io
+
+import numpy as np
+from PIL import Image, ImageOps
+
+# Phone uploads are often 12MP, while dlib's encoder works on a 150x150 chip of
+# the face. Uploads are therefore decoded at reduced size, faces are found on a
+# further downscaled copy, and only a crop around each face is encoded.
+
+FaceLocation = tuple[int, int, int, int]  # (top, right, bottom, left), as face_recognition uses
+
+def load_upload(image_file: bytes, max_side: int) -> np.ndarray:
+    """Decode an uploaded image to RGB with its longest side capped at `max_side`."""
+    image = Image.open(io.BytesIO(image_file))
+    # JPEG can decode straight at 1/2, 1/4 or 1/8 scale, skipping most of the
+    # work; draft keeps both sides at or above the size asked for
+    width, height = image.size
+    scale = max(width, height) / max_side
+    if scale > 1:
+        image.draft("RGB", (int(width / scale), int(height / scale)))
+    image = ImageOps.exif_transpose(image)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    image.thumbnail((max_side, max_side), Image.Resampling.BILINEAR)
+    return np.array(image)
+
+def downscale(image: np.ndarray, max_side: int) -> tuple[np.ndarray, float]:
+    """Copy of `image` with its longest side at most `max_side`, and the factor
+    that maps its coordinates back to `image`."""
+    scale = max(image.shape[:2]) / max_side
+    if scale <= 1:
+        return image, 1.0
+    small = Image.fromarray(image)
+    small.thumbnail((max_side, max_side), Image.Resampling.BILINEAR)
+    small = np.array(small)
+    return small, image.shape[1] / small.shape[1]
+
+def crop_around(image: np.ndarray, location: FaceLocation, scale: float,
+                margin: float) -> tuple[np.ndarray, FaceLocation]:
+    """Crop of `image` around a face found at `scale` times smaller, padded by
+    `margin` of the face size, with the face location inside the crop."""
+    top, right, bottom, left = (round(v * scale) for v in location)
+    pad_y = round((bottom - top) * margin)
+    pad_x = round((right - left) * margin)
+    y0, x0 = max(top - pad_y, 0), max(left - pad_x, 0)
+    y1, x1 = min(bottom + pad_y, image.shape[0]), min(right + pad_x, image.shape[1])
+    crop = np.ascontiguousarray(image[y0:y1, x0:x1])
+    return crop, (top - y0, min(right, x1) - x0, min(bottom, y1) - y0, left - x0)
@@ -0,0 +1,70 @@
+import time
+
+import cv2
+import numpy as np
+
+class FrameSampler:
+    """Samples a video source at a fixed analysis rate.
+
+    The source is treated as playing in real time: every read jumps to the frame
+    that is "live" now, skipping the frames in between with grab() (no decode)
+    or, when far behind, by seeking.
+    """
+
+    def __init__(self, cap: cv2.VideoCapture, analysis_fps: float, seek_threshold_frames: int = 250):
+        self.cap = cap
+        self.analysis_fps = analysis_fps
+        self.seek_threshold_frames = seek_threshold_frames
+        self.source_fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        self.position = 0  # index of the next frame the capture will return
+        self.samples = 0
+        self.skipped = 0
+        self.started_at: float = None
+
+    def read(self) -> tuple[bool, np.ndarray]:
+        now = time.monotonic()
+        if self.started_at is None:
+            self.started_at = now
+
+        live_frame = int((now - self.started_at) * self.source_fps)
+        behind = live_frame - self.position
+
+        if behind > self.seek_threshold_frames:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, live_frame)
+            self.skipped += behind
+            self.position = live_frame
+        else:
+            for _ in range(max(behind, 0)):
+                if not self.cap.grab():
+                    return False, None
+                self.skipped += 1
+                self.position += 1
+
+        ret, frame = self.cap.read()
+        if not ret:
+            return False, None
+
+        self.position += 1
+        self.samples += 1
+        return True, frame
+
+    def delay(self) -> float:
+        # Seconds until the next sample is due; zero when analysis is falling behind
+        if self.started_at is None:
+            return 0.0
+        next_sample_at = self.started_at + self.samples / self.analysis_fps
+        return max(next_sample_at - time.monotonic(), 0.0)
+
+    @property
+    def effective_fps(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        elapsed = time.monotonic() - self.started_at
+        return self.samples / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def lag(self) -> float:
+        # Seconds between the source's live position and the last frame analysed
+        if self.started_at is None:
+            return 0.0
+        return max(time.monotonic() - self.started_at - self.position / self.source_fps, 0.0)
@@ -0,0 +1,42 @@
+import json
+import os
+
+from pydantic import BaseModel
+
+from app.config import settings
+from app.core.seat_labels import SeatLayout, get_seat_layout
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class HallConfig(BaseModel):
+    hall_id: str
+    video_path: str = "static/video.mp4"
+    reference_image_path: str = "static/empty-auditorium.png"
+    seat_labels_path: str = "static/seat_labels.json"
+    edge_threshold: float = settings.edge_threshold
+    ssim_threshold: float = settings.ssim_threshold
+
+    def resolve(self, path: str) -> str:
+        # Relative paths in the hall config are relative to the app directory
+        return path if os.path.isabs(path) else os.path.join(BASE_DIR, path)
+
+    def seat_layout(self) -> SeatLayout:
+        return get_seat_layout(self.resolve(self.seat_labels_path))
+
+def load_halls() -> list[HallConfig]:
+    halls_path = os.path.join(BASE_DIR, settings.halls_config_path)
+
+    # Without a halls file the service keeps watching the single default hall
+    if not os.path.exists(halls_path):
+        return [HallConfig(hall_id=settings.default_hall_id)]
+
+    with open(halls_path) as f:
+        data = json.load(f)
+
+    return [HallConfig(**hall) for hall in data]
+
+halls = load_halls()
+
+def get_hall(hall_id: str = None) -> HallConfig:
+    hall_id = hall_id or settings.default_hall_id
+    return next((hall for hall in halls if hall.hall_id == hall_id), None)
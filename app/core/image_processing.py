@@ -17,6 +17,78 @@ def compute_ssim(empty_gray, aligned_filled_gray, x, y, w, h):
     score, diff = ssim(region_labeled, region_filled, full=True, win_size=win_size)
     return score
 
+def compute_ssim_batch(empty_gray, aligned_filled_gray, bounding_boxes, win_size=7):
+    # Same statistic as compute_ssim (uniform window, sample covariance, uint8 data
+    # range), but the local mean/variance/covariance maps are built once for the
+    # area covered by the seats and every seat is reduced from an integral image.
+    if not bounding_boxes:
+        return {}
+
+    frame_h, frame_w = empty_gray.shape[:2]
+    clipped = {}
+    for label, (x, y, w, h) in bounding_boxes.items():
+        # Clip like array slicing would
+        clipped[label] = (min(max(x, 0), frame_w), min(max(y, 0), frame_h),
+                          min(max(x + w, 0), frame_w), min(max(y + h, 0), frame_h))
+
+    boxes = np.array(list(clipped.values()))
+    ox, oy = boxes[:, 0].min(), boxes[:, 1].min()
+    ex, ey = boxes[:, 2].max(), boxes[:, 3].max()
+
+    X = np.float32(empty_gray[oy:ey, ox:ex])
+    Y = np.float32(aligned_filled_gray[oy:ey, ox:ex])
+
+    ksize = (win_size, win_size)
+    ux = cv2.boxFilter(X, cv2.CV_32F, ksize, borderType=cv2.BORDER_REFLECT)
+    uy = cv2.boxFilter(Y, cv2.CV_32F, ksize, borderType=cv2.BORDER_REFLECT)
+    uxx = cv2.sqrBoxFilter(X, cv2.CV_32F, ksize, borderType=cv2.BORDER_REFLECT)
+    uyy = cv2.sqrBoxFilter(Y, cv2.CV_32F, ksize, borderType=cv2.BORDER_REFLECT)
+    uxy = cv2.boxFilter(X * Y, cv2.CV_32F, ksize, borderType=cv2.BORDER_REFLECT)
+
+    NP = win_size ** 2
+    cov_norm = NP / (NP - 1)
+    C1 = (0.01 * 255) ** 2
+    C2 = (0.03 * 255) ** 2
+
+    # In-place arithmetic to keep the number of full-size temporaries down
+    ux_uy = ux * uy
+    ux_sq, uy_sq = ux * ux, uy * uy
+    numerator = uxy
+    numerator -= ux_uy
+    numerator *= 2 * cov_norm
+    numerator += C2
+    ux_uy *= 2
+    ux_uy += C1
+    numerator *= ux_uy
+    denominator = uxx
+    denominator += uyy
+    denominator -= ux_sq
+    denominator -= uy_sq
+    denominator *= cov_norm
+    denominator += C2
+    ux_sq += uy_sq
+    ux_sq += C1
+    denominator *= ux_sq
+    numerator /= denominator
+    S_sum = cv2.integral(numerator, sdepth=cv2.CV_64F)
+
+    pad = (win_size - 1) // 2
+    scores = {}
+
+    for label, (x0, y0, x1, y1) in clipped.items():
+        if min(x1 - x0, y1 - y0) <= 2 * pad:
+            # Region too small for the shared window, use the per-region path
+            x, y, w, h = bounding_boxes[label]
+            scores[label] = compute_ssim(empty_gray, aligned_filled_gray, x, y, w, h)
+            continue
+
+        # Drop the border skimage crops away, in coordinates of the covered area
+        x0, y0, x1, y1 = x0 + pad - ox, y0 + pad - oy, x1 - pad - ox, y1 - pad - oy
+        total = S_sum[y1, x1] - S_sum[y0, x1] - S_sum[y1, x0] + S_sum[y0, x0]
+        scores[label] = float(total) / ((x1 - x0) * (y1 - y0))
+
+    return scores
+
 def edge_detection_roi(image, x, y, w, h):
     region = image[y:y+h, x:x+w]
     edges = cv2.Canny(region, 200, 300)
@@ -26,26 +98,354 @@ def edge_detection_roi(image, x, y, w, h):
 
     return edges
 
-def orb_align_image(source_gray, target_gray):
-    orb = cv2.ORB_create(5000)
-    keypoints1, descriptors1 = orb.detectAndCompute(source_gray, None)
-    keypoints2, descriptors2 = orb.detectAndCompute(target_gray, None)
+def edge_density_batch(aligned_filled_gray, bounding_boxes, margin=8):
+    # Runs Canny and the vertical filter once over the area covered by the seats
+    # (plus a margin of real context) and reads every seat's mean edge value from
+    # an integral image. Because edges are traced with the surrounding pixels
+    # instead of a bare patch, values differ from edge_detection_roi: on the sample
+    # frames the mean absolute difference is ~1.3 (max ~14) on the 0-255 scale,
+    # which flipped 4 of 833 seat edge decisions at the default threshold.
+    if not bounding_boxes:
+        return {}
+
+    frame_h, frame_w = aligned_filled_gray.shape[:2]
+    boxes = np.array(list(bounding_boxes.values()))
+    x, y, w, h = boxes.T
+
+    # Clip like array slicing would
+    x0, y0 = np.clip(x, 0, frame_w), np.clip(y, 0, frame_h)
+    x1, y1 = np.clip(x + w, 0, frame_w), np.clip(y + h, 0, frame_h)
+
+    ox, oy = max(x0.min() - margin, 0), max(y0.min() - margin, 0)
+    ex, ey = min(x1.max() + margin, frame_w), min(y1.max() + margin, frame_h)
+
+    edges = cv2.Canny(aligned_filled_gray[oy:ey, ox:ex], 200, 300)
+    customFilter = np.array([[-1,2,-1],[-1,2,-1],[-1,2,-1]])
+    edges = cv2.filter2D(src=edges, kernel=customFilter, ddepth=-1)
+    edge_sum = cv2.integral(edges)
+
+    means = _integral_box_means(edge_sum, x0 - ox, y0 - oy, x1 - ox, y1 - oy)
+    return dict(zip(bounding_boxes.keys(), means.tolist()))
 
-    # Match features.
-    bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
-    matches = bf.match(descriptors1, descriptors2)
+def roi_change_scores(previous_gray, current_gray, boxes):
+    # Mean absolute difference over every (x, y, w, h) row of `boxes`, from a
+    # single integral image
+    if len(boxes) == 0:
+        return np.zeros(0)
 
-    # Sort them in the order of their distance.
-    matches = sorted(matches, key=lambda x: x.distance)
+    frame_h, frame_w = current_gray.shape[:2]
+    x, y, w, h = np.asarray(boxes).T
+    x0, y0 = np.clip(x, 0, frame_w), np.clip(y, 0, frame_h)
+    x1, y1 = np.clip(x + w, 0, frame_w), np.clip(y + h, 0, frame_h)
 
-    # Extract location of good matches
-    src_pts = np.float32([keypoints1[m.queryIdx].pt for m in matches]).reshape(-1, 1, 2)
-    dst_pts = np.float32([keypoints2[m.trainIdx].pt for m in matches]).reshape(-1, 1, 2)
+    diff_sum = cv2.integral(cv2.absdiff(previous_gray, current_gray))
+    return _integral_box_means(diff_sum, x0, y0, x1, y1)
+
+def _integral_box_means(integral_image, x0, y0, x1, y1):
+    totals = integral_image[y1, x1] - integral_image[y0, x1] - integral_image[y1, x0] + integral_image[y0, x0]
+    areas = (x1 - x0) * (y1 - y0)
+    return np.divide(totals, areas, out=np.zeros(len(areas)), where=areas > 0)
+
+def orb_features(image_gray, n_features=5000):
+    orb = cv2.ORB_create(n_features)
+    return orb.detectAndCompute(image_gray, None)
+
+MATCHER_BACKENDS = ("bf", "knn", "flann")
+
+class FeatureMatcher:
+    """Matches ORB descriptors of a target frame against the source (reference).
+
+    Backends:
+    - "bf": brute force with cross-checking, every match kept.
+    - "knn": brute force two nearest neighbours with Lowe's ratio test.
+    - "flann": the same ratio test over a FLANN LSH index of the source
+      descriptors, built once per source.
+
+    With `max_matches` set, only that many matches with the lowest Hamming
+    distance are returned.
+    """
+
+    def __init__(self, backend: str = "bf", ratio: float = 0.75, max_matches: int = 0):
+        if backend not in MATCHER_BACKENDS:
+            raise ValueError(f"Unknown matcher backend {backend!r}")
+        self.backend = backend
+        self.ratio = ratio
+        self.max_matches = max_matches
+        self._index = None
+        self._indexed_descriptors = None
+
+    def _flann(self, source_descriptors):
+        if source_descriptors is not self._indexed_descriptors:
+            index_params = dict(algorithm=6, table_number=6, key_size=12, multi_probe_level=1)  # FLANN_INDEX_LSH
+            self._index = cv2.FlannBasedMatcher(index_params, dict(checks=50))
+            self._index.add([source_descriptors])
+            self._index.train()
+            self._indexed_descriptors = source_descriptors
+        return self._index
+
+    def match(self, source_features, target_features) -> tuple[np.ndarray, np.ndarray]:
+        """Matched point coordinates as two (N, 1, 2) float32 arrays, source then target."""
+        source_keypoints, source_descriptors = source_features
+        target_keypoints, target_descriptors = target_features
+        if source_descriptors is None or target_descriptors is None:
+            return np.empty((0, 1, 2), np.float32), np.empty((0, 1, 2), np.float32)
+
+        if self.backend == "bf":
+            bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
+            matches = bf.match(source_descriptors, target_descriptors)
+            pairs = np.array([(m.queryIdx, m.trainIdx, m.distance) for m in matches], dtype=np.float32)
+        else:
+            # Targets query the source so a FLANN index of the source can be reused
+            if self.backend == "flann":
+                knn = self._flann(source_descriptors).knnMatch(target_descriptors, k=2)
+            else:
+                knn = cv2.BFMatcher(cv2.NORM_HAMMING).knnMatch(target_descriptors, source_descriptors, k=2)
+            pairs = np.array([
+                (best[0].trainIdx, best[0].queryIdx, best[0].distance)
+                for best in knn
+                if len(best) == 2 and best[0].distance < self.ratio * best[1].distance
+            ], dtype=np.float32)
+
+        pairs = pairs.reshape(-1, 3)
+        # Lowest distance first; stable so equal distances keep the matcher's order
+        pairs = pairs[np.argsort(pairs[:, 2], kind="stable")]
+        if self.max_matches:
+            pairs = pairs[:self.max_matches]
+
+        source_idx = pairs[:, 0].astype(np.intp)
+        target_idx = pairs[:, 1].astype(np.intp)
+        src_pts = cv2.KeyPoint_convert(source_keypoints)[source_idx].reshape(-1, 1, 2)
+        dst_pts = cv2.KeyPoint_convert(target_keypoints)[target_idx].reshape(-1, 1, 2)
+        return src_pts, dst_pts
+
+def orb_homography(source_gray, target_gray, source_features=None, matcher=None):
+    # Reuse precomputed features of the (unchanging) source image when given
+    if source_features is None:
+        source_features = orb_features(source_gray)
+    return match_homography(source_features, orb_features(target_gray), matcher)
+
+def match_homography(source_features, target_features, matcher=None):
+    return find_homography(source_features, target_features, matcher=matcher)[0]
+
+def find_homography(source_features, target_features, ransac_threshold=5.0, matcher=None):
+    """Homography mapping target points onto the source, with its RANSAC inlier
+    count and the number of matches it was fitted on."""
+    src_pts, dst_pts = (matcher or FeatureMatcher()).match(source_features, target_features)
+    if len(src_pts) < 4:
+        return None, 0, len(src_pts)
 
     # Compute homography matrix to align the images
-    matrix, mask = cv2.findHomography(dst_pts, src_pts, cv2.RANSAC, 5.0)
+    matrix, mask = cv2.findHomography(dst_pts, src_pts, cv2.RANSAC, ransac_threshold)
+
+    inliers = int(mask.sum()) if mask is not None else 0
+    return matrix, inliers, len(src_pts)
 
+def warp_to_source(source_gray, target_gray, matrix):
     # Align the source image with respect to the target image
-    aligned_target_gray = cv2.warpPerspective(target_gray, matrix, (source_gray.shape[1], source_gray.shape[0]))
+    return cv2.warpPerspective(target_gray, matrix, (source_gray.shape[1], source_gray.shape[0]))
+
+def orb_align_image(source_gray, target_gray, source_features=None):
+    matrix = orb_homography(source_gray, target_gray, source_features)
+    return warp_to_source(source_gray, target_gray, matrix)
+
+def _pyramid_level(image_gray, downscale):
+    small = cv2.resize(image_gray, None, fx=1 / downscale, fy=1 / downscale, interpolation=cv2.INTER_AREA)
+    # Maps small-image coordinates back to full resolution (pixel centres line up)
+    sx = image_gray.shape[1] / small.shape[1]
+    sy = image_gray.shape[0] / small.shape[0]
+    scale = np.array([[sx, 0, (sx - 1) / 2], [0, sy, (sy - 1) / 2], [0, 0, 1]])
+    return small, scale
+
+class HomographyEstimator:
+    """Coarse-to-fine homography estimation.
+
+    ORB and matching run on images downscaled by `downscale` with `n_features`
+    features, and the matrix is scaled back to full resolution. Only when the
+    coarse fit looks unreliable (too few RANSAC inliers, or too small a share of
+    the matches) is it re-estimated on the full-resolution images. A downscale
+    of 1 always estimates at full resolution.
+    """
+
+    def __init__(self, downscale: int = 1, n_features: int = 1000,
+                 min_inlier_ratio: float = 0.5, min_inliers: int = 50, matcher: FeatureMatcher = None):
+        self.downscale = downscale
+        self.n_features = n_features
+        self.min_inlier_ratio = min_inlier_ratio
+        self.min_inliers = min_inliers
+        self.matcher = matcher or FeatureMatcher()
+        # The source pyramid level gets its own matcher so each keeps its FLANN index
+        self.coarse_matcher = FeatureMatcher(self.matcher.backend, self.matcher.ratio, self.matcher.max_matches)
+        self.estimations = 0
+        self.refinements = 0
+        self._source = None
+        self._source_level = None
+
+    def _source_features(self, source_gray):
+        # The reference image rarely changes, so its pyramid level is kept
+        if source_gray is not self._source:
+            small, scale = _pyramid_level(source_gray, self.downscale)
+            self._source_level = orb_features(small, self.n_features), scale
+            self._source = source_gray
+        return self._source_level
+
+    def estimate(self, source_gray, target_gray, source_features=None):
+        return self.match(source_gray, target_gray, self.target_features(target_gray), source_features)
+
+    def target_features(self, target_gray):
+        """ORB features of the target at the estimation level, with the matrix that
+        maps their coordinates back to full resolution (None at full resolution)."""
+        if self.downscale <= 1:
+            return orb_features(target_gray), None
+        small_target, target_scale = _pyramid_level(target_gray, self.downscale)
+        return orb_features(small_target, self.n_features), target_scale
+
+    def match(self, source_gray, target_gray, target_level, source_features=None):
+        """Homography from features returned by `target_features`. A refinement at
+        full resolution computes its own ORB features for the target."""
+        self.estimations += 1
+        target_features, target_scale = target_level
+        if self.downscale <= 1:
+            if source_features is None:
+                source_features = orb_features(source_gray)
+            return match_homography(source_features, target_features, self.matcher)
+
+        small_source_features, source_scale = self._source_features(source_gray)
+        matrix, inliers, matches = find_homography(
+            small_source_features, target_features,
+            ransac_threshold=5.0 / self.downscale, matcher=self.coarse_matcher,
+        )
+
+        if matrix is None or inliers < self.min_inliers or inliers < self.min_inlier_ratio * matches:
+            self.refinements += 1
+            return orb_homography(source_gray, target_gray, source_features, self.matcher)
+
+        return source_scale @ matrix @ np.linalg.inv(target_scale)
+
+def plausible_homography(matrix, shape, max_scale_change=2.0):
+    """Rejects matrices that fold, flip or grossly rescale the frame, which is
+    what RANSAC returns when it was fitted on noise."""
+    if matrix is None or not np.all(np.isfinite(matrix)):
+        return False
+    h, w = shape[:2]
+    corners = np.float32([[0, 0], [w, 0], [w, h], [0, h]]).reshape(-1, 1, 2)
+    warped = cv2.perspectiveTransform(corners, matrix)
+    if not cv2.isContourConvex(warped):
+        return False
+    area_ratio = cv2.contourArea(warped) / (w * h)
+    return 1 / max_scale_change <= area_ratio <= max_scale_change
+
+def ecc_homography(source_gray, target_gray, downscale=4, iterations=50, eps=1e-4):
+    """Homography from intensity alignment (ECC) on downscaled images, starting
+    from identity. Works without features, so it still has a chance on dark or
+    low-texture frames; returns None when it does not converge."""
+    small_source, source_scale = _pyramid_level(source_gray, downscale)
+    small_target, target_scale = _pyramid_level(target_gray, downscale)
+    warp = np.eye(3, dtype=np.float32)
+    criteria = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, iterations, eps)
+    try:
+        _, warp = cv2.findTransformECC(small_source, small_target, warp, cv2.MOTION_HOMOGRAPHY, criteria, None, 5)
+    except cv2.error:
+        return None
+    # ECC maps source points to target points; warp_to_source wants the inverse
+    return np.linalg.inv(target_scale @ warp @ np.linalg.inv(source_scale))
+
+def _even_dft_size(n):
+    while n > 2 and (n % 2 or cv2.getOptimalDFTSize(n) != n):
+        n -= 1
+    return n
+
+ALIGNMENT_PATHS = ("reused", "estimated", "last_good", "ecc", "skipped")
+
+class HomographyTracker:
+    """Keeps the last good homography for a fixed camera and re-estimates it only
+    when phase correlation on a downscaled frame shows the camera has moved.
+
+    When estimation fails (too few matches, no or implausible homography) the
+    frame is aligned with the last good homography, else with an ECC estimate,
+    and only skipped (align returns None) when neither is available. `paths`
+    counts how each frame was aligned and `last_path` names the latest one.
+    """
+
+    def __init__(self, drift_threshold: float = 1.0, downscale: int = 4,
+                 estimator: HomographyEstimator = None):
+        self.drift_threshold = drift_threshold  # in full-resolution pixels
+        self.downscale = downscale
+        self.estimator = estimator or HomographyEstimator()
+        self.matrix = None
+        self.frames = 0
+        self.reestimations = 0
+        self.paths = dict.fromkeys(ALIGNMENT_PATHS, 0)
+        self.last_path: str = None
+        self._source = None
+        self._anchor = None
+        self._window = None
+
+    def _thumbnail(self, image_gray):
+        small = cv2.resize(image_gray, None, fx=1 / self.downscale, fy=1 / self.downscale,
+                           interpolation=cv2.INTER_AREA)
+        # phaseCorrelate pads to an optimal DFT size and an odd padded size biases
+        # the result by half a pixel, so crop to an even size that needs no padding
+        h, w = (_even_dft_size(n) for n in small.shape)
+        return np.float32(small[:h, :w])
+
+    def drift(self, target_gray) -> float:
+        small = self._thumbnail(target_gray)
+        if self._anchor is None or small.shape != self._anchor.shape:
+            return float("inf")
+        (dx, dy), _ = cv2.phaseCorrelate(self._anchor, small, self._window)
+        return float(np.hypot(dx, dy)) * self.downscale
+
+    def align(self, source_gray, target_gray, source_features=None, reuse=True):
+        self.frames += 1
+
+        # A new reference image invalidates the cached matrix
+        if source_gray is not self._source:
+            self.reset()
+            self._source = source_gray
+
+        if reuse and self.matrix is not None and self.drift(target_gray) <= self.drift_threshold:
+            return self._warp(source_gray, target_gray, self.matrix, "reused")
+
+        matrix = self._estimate(source_gray, target_gray, source_features)
+        if matrix is not None:
+            self.matrix = matrix
+            self._anchor = self._thumbnail(target_gray)
+            self._window = cv2.createHanningWindow(self._anchor.shape[::-1], cv2.CV_32F)
+            self.reestimations += 1
+            return self._warp(source_gray, target_gray, matrix, "estimated")
+
+        if self.matrix is not None:
+            return self._warp(source_gray, target_gray, self.matrix, "last_good")
+
+        # Never kept as the last good matrix; the next frame tries features again
+        matrix = ecc_homography(source_gray, target_gray, self.downscale)
+        if plausible_homography(matrix, source_gray.shape):
+            return self._warp(source_gray, target_gray, matrix, "ecc")
+
+        self._count("skipped")
+        return None
+
+    def _estimate(self, source_gray, target_gray, source_features):
+        try:
+            matrix = self.estimator.estimate(source_gray, target_gray, source_features)
+        except cv2.error:
+            return None
+        return matrix if plausible_homography(matrix, source_gray.shape) else None
+
+    def _warp(self, source_gray, target_gray, matrix, path):
+        self._count(path)
+        return warp_to_source(source_gray, target_gray, matrix)
+
+    def _count(self, path):
+        self.paths[path] += 1
+        self.last_path = path
+
+    def reset(self):
+        self.matrix = None
+        self._source = None
+        self._anchor = None
+        self._window = None
 
-    return aligned_target_gray
\ No newline at end of file
+    @property
+    def reestimation_rate(self) -> float:
+        return self.reestimations / self.frames if self.frames else 0.0
@@ -0,0 +1,152 @@
+import bisect
+import math
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable
+
+# Minimal Prometheus text exposition. Recording is a bisect and a few integer
+# adds, and gauges are callbacks that only run when /metrics is scraped, so an
+# unscraped server pays next to nothing for them.
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _format_labels(labelnames: tuple[str, ...], labelvalues: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1):
+        self.values[labelvalues] = self.values.get(labelvalues, 0) + amount
+
+    def drain(self) -> dict[tuple[str, ...], float]:
+        values, self.values = self.values, {}
+        return values
+
+    def merge(self, values: dict[tuple[str, ...], float]):
+        for labelvalues, value in values.items():
+            self.inc(*labelvalues, amount=value)
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        for labelvalues, value in self.values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}"
+
+class Gauge:
+    """Read at scrape time from `collect`, which yields (labelvalues, value) pairs."""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...],
+                 collect: Callable[[], Iterable[tuple[tuple[str, ...], float]]]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.collect = collect
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} gauge"
+        for labelvalues, value in self.collect():
+            yield f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}"
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # Per label set: non-cumulative bucket counts (last one is +Inf) and the sum
+        self.values: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *labelvalues: str):
+        state = self.values.get(labelvalues)
+        if state is None:
+            state = self.values[labelvalues] = ([0] * (len(self.buckets) + 1), [0.0])
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1][0] += value
+
+    @contextmanager
+    def time(self, *labelvalues: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labelvalues)
+
+    def drain(self) -> dict[tuple[str, ...], tuple[list[int], float]]:
+        """Hand over everything observed so far and start again from zero; used to
+        ship observations out of worker processes."""
+        values = {labelvalues: (counts, total[0]) for labelvalues, (counts, total) in self.values.items()}
+        self.values = {}
+        return values
+
+    def merge(self, values: dict[tuple[str, ...], tuple[list[int], float]]):
+        for labelvalues, (counts, total) in values.items():
+            state = self.values.get(labelvalues)
+            if state is None:
+                state = self.values[labelvalues] = ([0] * (len(self.buckets) + 1), [0.0])
+            for i, count in enumerate(counts):
+                state[0][i] += count
+            state[1][0] += total
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for labelvalues, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labelvalues, le)} {cumulative}"
+            labels = _format_labels(self.labelnames, labelvalues)
+            yield f"{self.name}_sum{labels} {_format_value(total[0])}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+class Registry:
+    def __init__(self):
+        self.metrics: list[Counter | Gauge | Histogram] = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+registry = Registry()
+
+stage_seconds = registry.register(Histogram(
+    "seat_sense_stage_seconds", "Latency of each occupancy pipeline stage per frame.", ("stage",)
+))
+frames_processed = registry.register(Counter(
+    "seat_sense_frames_processed_total", "Frames that went through occupancy detection.", ("hall",)
+))
+frames_dropped = registry.register(Counter(
+    "seat_sense_frames_dropped_total", "Frames that were not analysed.", ("hall", "reason")
+))
+alignment_paths = registry.register(Counter(
+    "seat_sense_alignment_total", "Frames by how they were aligned to the reference.", ("hall", "path")
+))
+
+# Recorded inside detection worker processes and shipped to the serving process
+WORKER_METRICS = (stage_seconds, alignment_paths)
+
+def drain_worker_metrics() -> list:
+    return [metric.drain() for metric in WORKER_METRICS]
+
+def merge_worker_metrics(values: list):
+    for metric, metric_values in zip(WORKER_METRICS, values):
+        metric.merge(metric_values)
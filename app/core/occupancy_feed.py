@@ -0,0 +1,88 @@
+import json
+import struct
+
+import numpy as np
+
+from app.core.metrics import stage_seconds
+from app.core.seat_labels import SeatLayout
+
+OCCUPANCY_FORMATS = ("json", "bitset")
+
+def group_occupancy(occupancy: dict[str, bool]) -> dict[str, dict[str, bool]]:
+    # Group and sort occupancy data
+    grouped_sorted_occupancy_data = {}
+    for seat, status in occupancy.items():
+        row = seat[0]
+        seat_number = seat[1:]
+        if row not in grouped_sorted_occupancy_data:
+            grouped_sorted_occupancy_data[row] = {}
+        grouped_sorted_occupancy_data[row][seat_number] = status
+
+    return {
+        row: dict(sorted(seats.items(), key=lambda x: int(x[0])))
+        for row, seats in sorted(grouped_sorted_occupancy_data.items())
+    }
+
+class OccupancyFeed:
+    """Sequenced occupancy of one hall.
+
+    Clients receive one snapshot message on connect and then delta messages that
+    only carry the seats that flipped. Every delta bumps `seq`; a client drops
+    deltas with a seq not above its snapshot's and resyncs on a gap.
+
+    Snapshots are encoded once per seq and format and the same buffer is sent to
+    every subscriber. The "bitset" format is a 4-byte big-endian seq followed by
+    one bit per seat in seat layout order, most significant bit first.
+    """
+
+    def __init__(self, hall_id: str, layout: SeatLayout = None):
+        self.hall_id = hall_id
+        self.layout = layout
+        self.seq = 0
+        self.seats: dict[str, bool] = {}
+        self.grouped: dict[str, dict[str, bool]] = {}
+        self._encoded: dict[str, str | bytes] = {}
+
+    def update(self, occupancy: dict[str, bool]) -> dict:
+        changes = {seat: status for seat, status in occupancy.items() if self.seats.get(seat) != status}
+        if not changes:
+            return None
+
+        self.seq += 1
+        self.seats = dict(occupancy)
+        # The compiled layout already knows the output order; unknown layouts
+        # fall back to grouping and sorting the labels
+        with stage_seconds.time("grouping"):
+            if self.layout is not None and len(self.seats) == len(self.layout.labels):
+                group = self.layout.group
+            else:
+                group = group_occupancy
+            self.grouped = group(self.seats)
+            grouped_changes = group(changes)
+        self._encoded = {}
+
+        return {"type": "delta", "hall_id": self.hall_id, "seq": self.seq, "occupancy": grouped_changes}
+
+    def snapshot(self) -> dict:
+        return {"type": "snapshot", "hall_id": self.hall_id, "seq": self.seq, "occupancy": self.grouped}
+
+    def encoded_snapshot(self, format: str = "json") -> str | bytes:
+        if format not in self._encoded:
+            if format == "bitset":
+                labels = self.layout.labels if self.layout is not None else None
+                self._encoded[format] = encode_bitset(self.seq, self.seats, labels)
+            else:
+                self._encoded[format] = encode_message(self.snapshot())
+        return self._encoded[format]
+
+def encode_message(message: dict) -> str:
+    return json.dumps(message, separators=(",", ":"))
+
+def encode_bitset(seq: int, seats: dict[str, bool], labels: list[str] = None) -> bytes:
+    # Bits follow `labels` when given (seats missing from `seats` are sent as
+    # free), else the order of `seats` itself
+    if labels is None:
+        labels = list(seats)
+    values = (seats.get(label, False) for label in labels)
+    bits = np.packbits(np.fromiter(values, dtype=np.uint8, count=len(labels)))
+    return struct.pack(">I", seq) + bits.tobytes()
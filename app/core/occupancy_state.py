@@ -0,0 +1,114 @@
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+HEADER_FIELDS = 3  # version, seat count, stale flag (all uint64)
+HEADER_SIZE = HEADER_FIELDS * 8
+READ_ATTEMPTS = 1000  # a write copies a few hundred bytes, so this is plenty
+
+class SharedOccupancyState:
+    """Occupancy of one hall in a shared memory segment that any process on the
+    host can read without IPC or serialization.
+
+    Layout: a uint64 header (version, seat count, stale flag) followed by one
+    byte per seat in seat layout order. The version is a seqlock: the writer
+    makes it odd while writing and even again when done, and readers retry until
+    they see the same even version before and after copying the seats. Readers
+    give up after READ_ATTEMPTS tries rather than spin on a torn write.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, labels: list[str]):
+        self.shm = shm
+        self.labels = labels
+        self.header = np.ndarray((HEADER_FIELDS,), dtype=np.uint64, buffer=shm.buf)
+        self.seats = np.ndarray((len(labels),), dtype=np.uint8, buffer=shm.buf, offset=HEADER_SIZE)
+        self._cached_version = None
+        self._cached_dict: dict[str, bool] = None
+
+    @staticmethod
+    def segment_name(hall_id: str, prefix: str) -> str:
+        return f"{prefix}-{hall_id}"
+
+    @classmethod
+    def create(cls, name: str, labels: list[str]) -> "SharedOccupancyState":
+        size = HEADER_SIZE + len(labels)
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a previous writer; reuse it when the layout still fits
+            shm = shared_memory.SharedMemory(name=name)
+            state = cls(shm, labels)
+            if state.header[1] == len(labels):
+                _untrack(shm)
+                # A writer that died mid-write left the version odd; end that write
+                if state.header[0] % 2:
+                    state.header[0] += 1
+                return state
+            state.header[2] = 1  # tell readers to re-attach
+            del state
+            shm.close()
+            shm.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+
+        # The segment outlives this process so a new writer can pick it up
+        _untrack(shm)
+        state = cls(shm, labels)
+        state.header[:] = (0, len(labels), 0)
+        return state
+
+    @classmethod
+    def attach(cls, name: str, labels: list[str]) -> "SharedOccupancyState":
+        try:
+            shm = shared_memory.SharedMemory(name=name)
+        except FileNotFoundError:
+            return None
+        _untrack(shm)
+
+        state = cls(shm, labels)
+        if state.header[1] != len(labels):
+            state.close()
+            return None
+        return state
+
+    @property
+    def stale(self) -> bool:
+        return bool(self.header[2])
+
+    def write(self, occupancy: dict[str, bool]):
+        values = np.fromiter((occupancy.get(label, 0) for label in self.labels),
+                             dtype=np.uint8, count=len(self.labels))
+        self.header[0] += 1  # odd: write in progress
+        self.seats[:] = values
+        self.header[0] += 1
+
+    def read(self) -> tuple[int, np.ndarray] | None:
+        """Version and seats as of one complete write, or None if no consistent
+        copy could be taken."""
+        for _ in range(READ_ATTEMPTS):
+            before = int(self.header[0])
+            if before % 2:
+                continue
+            seats = self.seats.copy()
+            if int(self.header[0]) == before:
+                return before // 2, seats
+        return None
+
+    def to_dict(self) -> dict[str, bool] | None:
+        # Built lazily and only for consumers that still want the dict form
+        snapshot = self.read()
+        if snapshot is None:
+            return None
+        version, seats = snapshot
+        if version != self._cached_version:
+            self._cached_dict = dict(zip(self.labels, seats.tolist()))
+            self._cached_version = version
+        return self._cached_dict
+
+    def close(self):
+        del self.header, self.seats
+        self.shm.close()
+
+def _untrack(shm: shared_memory.SharedMemory):
+    # Python < 3.13 registers every attach with the resource tracker, which would
+    # unlink the segment when this process exits
+    resource_tracker.unregister(shm._name, "shared_memory")
@@ -0,0 +1,44 @@
+import os
+import threading
+
+import cv2
+import numpy as np
+
+from app.core.image_processing import orb_features
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+EMPTY_AUDITORIUM_PATH = os.path.join(BASE_DIR, "static/empty-auditorium.png")
+
+class ReferenceScene:
+    """Empty-auditorium reference image with its ORB features, loaded once and
+    reloaded only when the file on disk changes or a reload is requested."""
+
+    def __init__(self, image_path: str = EMPTY_AUDITORIUM_PATH):
+        self.image_path = image_path
+        self.gray: np.ndarray = None
+        self.keypoints = None
+        self.descriptors: np.ndarray = None
+        self.mtime: float = None
+        self._lock = threading.Lock()
+
+    def reload(self):
+        with self._lock:
+            mtime = os.path.getmtime(self.image_path)
+            gray = cv2.imread(self.image_path, cv2.IMREAD_GRAYSCALE)
+            if gray is None:
+                raise FileNotFoundError(f"Failed to read reference image at {self.image_path}")
+
+            self.keypoints, self.descriptors = orb_features(gray)
+            self.gray = gray
+            self.mtime = mtime
+
+    def get(self) -> "ReferenceScene":
+        if self.gray is None or os.path.getmtime(self.image_path) != self.mtime:
+            self.reload()
+        return self
+
+    @property
+    def features(self):
+        return self.keypoints, self.descriptors
+
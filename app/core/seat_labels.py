@@ -1,10 +1,15 @@
 import json
 import os
+from functools import lru_cache
+
+import numpy as np
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-def get_bounding_boxes():
-    with open(os.path.join(BASE_DIR, "static/seat_labels.json")) as f:
+SEAT_LABELS_PATH = os.path.join(BASE_DIR, "static/seat_labels.json")
+
+def get_bounding_boxes(seat_labels_path: str = SEAT_LABELS_PATH):
+    with open(seat_labels_path) as f:
         data = json.load(f)
 
     bounding_boxes = {}
@@ -20,4 +25,43 @@ def get_bounding_boxes():
 
     return bounding_boxes
 
-bounding_boxes = get_bounding_boxes()
\ No newline at end of file
+class SeatLayout:
+    """Seat layout compiled once at load time: seat order, bounding boxes as an
+    (N, 4) int32 array, and the row/seat output ordering, so no per-frame
+    regrouping or sorting is needed."""
+
+    def __init__(self, bounding_boxes: dict[str, list[int]]):
+        self.bounding_boxes = bounding_boxes
+        self.labels = list(bounding_boxes.keys())
+        self.boxes = np.array(list(bounding_boxes.values()), dtype=np.int32).reshape(-1, 4)
+
+        # Label "A12" is row "A", seat "12"
+        self.row_labels = [label[0] for label in self.labels]
+        self.seat_numbers = [label[1:] for label in self.labels]
+        self.rows = sorted(set(self.row_labels))
+
+        # Output ordering: rows alphabetically, seats numerically within a row
+        self.order = np.array(
+            sorted(range(len(self.labels)), key=lambda i: (self.row_labels[i], int(self.seat_numbers[i]))),
+            dtype=np.int32,
+        )
+        self.groups: list[tuple[str, list[tuple[str, str]]]] = [
+            (row, [(self.seat_numbers[i], self.labels[i]) for i in self.order if self.row_labels[i] == row])
+            for row in self.rows
+        ]
+
+    def group(self, occupancy: dict[str, bool]) -> dict[str, dict[str, bool]]:
+        # Works for a subset of the seats too, e.g. the ones a delta carries
+        grouped = {}
+        for row, seats in self.groups:
+            row_occupancy = {seat_number: occupancy[label] for seat_number, label in seats if label in occupancy}
+            if row_occupancy:
+                grouped[row] = row_occupancy
+        return grouped
+
+@lru_cache
+def get_seat_layout(seat_labels_path: str = SEAT_LABELS_PATH) -> SeatLayout:
+    return SeatLayout(get_bounding_boxes(seat_labels_path))
+
+seat_layout = get_seat_layout()
+bounding_boxes = seat_layout.bounding_boxes
\ No newline at end of file
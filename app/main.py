@@ -8,15 +8,23 @@ from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db import get_db
-from app.routers import attendance, auth, event, websocket
-from app.services.occupancy_detection import compute_occupancy_periodically, process_video_on_loop
+from app.routers import (attendance, auth, event, metrics, occupancy,
+                         websocket)
+from app.services.face_inference import stop_face_executor
+from app.services.occupancy_detection import (compute_occupancy_periodically,
+                                              run_occupancy_service,
+                                              stop_occupancy_executor)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    occupancy_task = asyncio.create_task(process_video_on_loop())
+    # Worker processes for detection start on first use, so only the worker
+    # that leads the occupancy bus spawns them
+    occupancy_task = asyncio.create_task(run_occupancy_service())
     yield
     occupancy_task.cancel()
+    stop_occupancy_executor()
+    stop_face_executor()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -37,7 +45,9 @@ app.add_middleware(
 app.include_router(attendance.router, prefix="/attendance", tags=["attendance"])
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(event.router, prefix="/event", tags=["event"])
+app.include_router(occupancy.router, prefix="/occupancy", tags=["occupancy"])
 app.include_router(websocket.router, tags=["websocket"])
+app.include_router(metrics.router, tags=["metrics"])
 
 @app.get("/")
 async def get():
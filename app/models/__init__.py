@@ -3,7 +3,7 @@ from enum import Enum
 
 from pgvector.sqlalchemy import Vector  # Import Vector for embedding storage
 from sqlalchemy import (TIMESTAMP, Boolean, Column, Date, Float, ForeignKey,
-                        String, Time)
+                        Index, String, Time)
 from sqlalchemy.dialects.postgresql import ENUM, UUID
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
@@ -67,7 +67,17 @@ class FaceEmbedding(Base):
     __tablename__ = "face_embeddings"
 
     embedding_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey('users.user_id', ondelete="CASCADE"), nullable=False)
+    user_id = Column(UUID(as_uuid=True), ForeignKey('users.user_id', ondelete="CASCADE"), nullable=False, index=True)
     embedding = Column(Vector(128), nullable=False)
 
-    user = relationship("User", back_populates="face_embeddings")
\ No newline at end of file
+    user = relationship("User", back_populates="face_embeddings")
+
+    __table_args__ = (
+        # ANN index for 1:N identification, queried with the <=> (cosine distance) operator
+        Index(
+            "face_embedding_cosine_idx", embedding,
+            postgresql_using="ivfflat",
+            postgresql_with={"lists": 100},
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+    )
\ No newline at end of file
@@ -1,10 +1,8 @@
-import io
 from typing import Annotated, List, Tuple
 
-import face_recognition
 from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
 from fastapi.logger import logger
-from sqlalchemy import delete, select
+from sqlalchemy import delete, insert, select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
@@ -16,8 +14,10 @@ from app.schema.attendance import (AttendanceByEventRequest,
                                    AttendanceByEventResponse,
                                    DeleteAttendanceRequest,
                                    DeleteAttendanceResponse,
+                                   IdentifiedFace, IdentifyAttendanceResponse,
                                    MarkAttendanceRequest,
                                    MarkAttendanceResponse)
+from app.services.face_inference import encode_faces
 
 router = APIRouter()
 
@@ -81,30 +81,28 @@ async def mark_attendance_from_image(
         if not verify_inside_audi_within_radius(latitude, longitude):
             raise HTTPException(status_code=403, detail="User is not within the required radius")
 
-        image_data = face_recognition.load_image_file(io.BytesIO(image_file))
-        face_encodings = face_recognition.face_encodings(image_data)
+        face_encodings = await encode_faces(image_file)
 
         if not face_encodings:
             raise HTTPException(status_code=400, detail="No face detected")
 
         query_embedding = face_encodings[0]
 
-        # Optimize database query - fetch user embeddings in one query
+        # Only the closest of the user's embeddings comes back from the database.
+        # Euclidean distance, as face_recognition.compare_faces uses.
+        distance = FaceEmbedding.embedding.l2_distance(query_embedding)
         result = await db.execute(
-            select(FaceEmbedding.embedding)
+            select(distance)
             .filter(FaceEmbedding.user_id == user.user_id)
+            .order_by(distance)
+            .limit(1)
         )
-        user_embeddings = result.scalars().all()
+        best_distance = result.scalar_one_or_none()
 
-        if not user_embeddings:
+        if best_distance is None:
             raise HTTPException(status_code=404, detail="No face embeddings found for the user")
 
-        # Optimize face comparison by using batch processing
-        # Convert database embeddings to a list of arrays for batch comparison
-        db_embedding_arrays = [embedding for embedding in user_embeddings]
-        matches = face_recognition.compare_faces(db_embedding_arrays, query_embedding, tolerance=0.6)
-
-        if not any(matches):
+        if best_distance > settings.face_match_tolerance:
             raise HTTPException(status_code=403, detail="Forbidden: No matching face found for the user")
 
         # Check if event exists using get or 404 pattern
@@ -131,6 +129,109 @@ async def mark_attendance_from_image(
         logger.error(f"Error marking attendance from image: {e}")
         raise HTTPException(status_code=500)
 
+@router.post("/identify-from-image", response_model=IdentifyAttendanceResponse)
+async def identify_attendance_from_image(
+    event_id: Annotated[str, Form()],
+    image: UploadFile = File(...),
+    db: AsyncSession = Depends(get_db),
+    user: UserTokenModel = Depends(get_user_from_header)
+):
+    # Kiosk mode: everyone recognised in the frame is marked present
+    if user.role != Role.ADMIN.value:
+        raise HTTPException(status_code=403, detail="Forbidden: Admin role required")
+
+    image_file = await image.read()
+    if not image_file:
+        raise HTTPException(status_code=400, detail="Failed to read image file")
+
+    try:
+        # Encode before the first query: that query begins the transaction, and a
+        # pooled connection should not sit idle in it while the face queue drains
+        face_encodings = await encode_faces(image_file, settings.face_identify_detect_max_side)
+        if not face_encodings:
+            raise HTTPException(status_code=400, detail="No face detected")
+
+        event = await db.execute(select(Event).filter(Event.event_id == event_id))
+        event = event.scalar_one_or_none()
+        if not event:
+            raise HTTPException(status_code=404, detail="Event not found")
+
+        # Applies to this transaction only; more probes trade speed for recall
+        await db.execute(text(f"SET LOCAL ivfflat.probes = {int(settings.face_ivfflat_probes)}"))
+
+        faces: List[IdentifiedFace] = []
+        for encoding in face_encodings:
+            # The cosine index shortlists candidates, which are then held to the
+            # same Euclidean tolerance as 1:1 verification
+            nearest = (
+                select(
+                    FaceEmbedding.user_id,
+                    FaceEmbedding.embedding.l2_distance(encoding).label("distance"),
+                )
+                .order_by(FaceEmbedding.embedding.cosine_distance(encoding))
+                .limit(settings.face_identify_candidates)
+                .subquery()
+            )
+            result = await db.execute(
+                select(nearest.c.user_id, nearest.c.distance, User.first_name, User.last_name, User.email)
+                .join(User, User.user_id == nearest.c.user_id)
+                .order_by(nearest.c.distance)
+                .limit(1)
+            )
+            match = result.one_or_none()
+
+            if match is None or match.distance > settings.face_match_tolerance:
+                faces.append(IdentifiedFace(
+                    distance=match.distance if match else None, confidence=0.0, marked=False
+                ))
+                continue
+
+            faces.append(IdentifiedFace(
+                user_id=str(match.user_id),
+                first_name=match.first_name,
+                last_name=match.last_name,
+                email=match.email,
+                distance=match.distance,
+                confidence=1 - match.distance / settings.face_match_tolerance,
+                marked=False,
+            ))
+
+        # One row per recognised person not already marked for this event
+        recognised = {face.user_id for face in faces if face.user_id is not None}
+        already_marked = await db.execute(
+            select(Attendance.user_id)
+            .filter(Attendance.event_id == event_id, Attendance.user_id.in_(recognised))
+        )
+        to_mark = recognised - {str(user_id) for user_id in already_marked.scalars().all()}
+
+        if to_mark:
+            await db.execute(insert(Attendance), [
+                {
+                    "user_id": user_id,
+                    "event_id": event_id,
+                    "latitude": settings.audi_latitude,
+                    "longitude": settings.audi_longitude,
+                } for user_id in to_mark
+            ])
+        await db.commit()
+
+        for face in faces:
+            face.marked = face.user_id in to_mark
+            to_mark.discard(face.user_id)  # the same person twice in a frame is marked once
+
+        return IdentifyAttendanceResponse(
+            message=f"Attendance marked for {sum(face.marked for face in faces)} of {len(faces)} faces",
+            faces=faces,
+        )
+
+    except HTTPException as http_exc:
+        logger.error(f"HTTPException: {http_exc.detail}")
+        raise http_exc
+
+    except Exception as e:
+        logger.error(f"Error identifying attendance from image: {e}")
+        raise HTTPException(status_code=500)
+
 @router.post("/by-event", response_model=List[AttendanceByEventResponse])
 async def get_attendance_by_event(
     req: AttendanceByEventRequest,
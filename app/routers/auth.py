@@ -1,9 +1,7 @@
-import io
 import random
 import sqlite3
 
 import bcrypt
-import face_recognition
 from fastapi import (APIRouter, BackgroundTasks, Depends, File, HTTPException,
                      UploadFile)
 from fastapi.logger import logger
@@ -20,6 +18,7 @@ from app.schema.auth import (ForgotPasswordRequest, ForgotPasswordResponse,
                              RegisterFaceResponse, ResetPasswordRequest,
                              ResetPasswordResponse, SendOTPRequest,
                              SignupRequest, SignupResponse, VerifyOTPRequest)
+from app.services.face_inference import encode_faces
 from app.services.resend_mail import send_otp_verification_email
 
 router = APIRouter()
@@ -267,10 +266,7 @@ async def register_face(
         if not image_file:
             raise HTTPException(status_code=400, detail="Failed to read image file")
 
-        image_data = io.BytesIO(image_file)
-
-        image = face_recognition.load_image_file(image_data)
-        face_encodings = face_recognition.face_encodings(image)
+        face_encodings = await encode_faces(image_file)
 
         if not face_encodings:
             raise HTTPException(status_code=400, detail="No face detected")
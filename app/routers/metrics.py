@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.metrics import registry
+from app.services.occupancy_detection import collect_worker_metrics
+
+router = APIRouter()
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    await collect_worker_metrics()
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,64 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.logger import logger
+
+from app.core.hall_config import get_hall, halls
+from app.core.token_manager import UserTokenModel, get_user_from_header
+from app.models import Role
+from app.schema.occupancy import (HallOccupancyResponse,
+                                  ReloadReferenceResponse, SeatOrderResponse)
+from app.services.occupancy_detection import (get_hall_occupancy,
+                                              hall_samplers,
+                                              reload_reference_scene)
+
+router = APIRouter()
+
+@router.get("/halls", response_model=List[HallOccupancyResponse])
+async def list_hall_occupancy(
+    user: UserTokenModel = Depends(get_user_from_header)
+):
+    responses = []
+    for hall in halls:
+        sampler = hall_samplers.get(hall.hall_id)
+        responses.append(HallOccupancyResponse(
+            hall_id=hall.hall_id,
+            occupancy=get_hall_occupancy(hall.hall_id),
+            analysis_fps=sampler.effective_fps if sampler else 0.0,
+            lag_seconds=sampler.lag if sampler else 0.0,
+        ))
+    return responses
+
+@router.get("/seats", response_model=SeatOrderResponse)
+async def get_seat_order(
+    hall_id: Optional[str] = None,
+    user: UserTokenModel = Depends(get_user_from_header)
+):
+    # Seat labels in the order of the bits in "bitset" websocket messages
+    hall = get_hall(hall_id)
+    if hall is None:
+        raise HTTPException(status_code=404, detail="Hall not found")
+
+    return SeatOrderResponse(hall_id=hall.hall_id, seats=hall.seat_layout().labels)
+
+@router.post("/reload-reference", response_model=ReloadReferenceResponse)
+async def reload_reference(
+    hall_id: Optional[str] = None,
+    user: UserTokenModel = Depends(get_user_from_header)
+):
+    if user.role != Role.ADMIN.value:
+        raise HTTPException(status_code=403, detail="Forbidden: Admin role required")
+    try:
+        if hall_id is not None and get_hall(hall_id) is None:
+            raise HTTPException(status_code=404, detail="Hall not found")
+
+        await reload_reference_scene(hall_id)
+        return {"message": "Reference image reloaded successfully"}
+
+    except HTTPException as http_exc:
+        logger.error(f"HTTPException: {http_exc.detail}")
+        raise http_exc
+
+    except Exception as e:
+        logger.error(f"Error reloading reference image: {e}")
+        raise HTTPException(status_code=500)
@@ -6,7 +6,9 @@ from fastapi import (APIRouter, Depends, Query, WebSocket, WebSocketDisconnect,
                      WebSocketException, status)
 from fastapi.logger import logger
 
-from app.core.connection_manager import manager
+from app.core.connection_manager import get_manager
+from app.core.hall_config import get_hall
+from app.core.occupancy_feed import OCCUPANCY_FORMATS
 from app.core.token_manager import decode_access_token
 from app.services.occupancy_detection import get_occupancy
 
@@ -18,7 +20,18 @@ async def get_token_from_query(websocket: WebSocket, token: Annotated[str | None
     return token
 
 @router.websocket("/ws")
-async def websocket_endpoint(socket: WebSocket, token: Annotated[str, Depends(get_token_from_query)]):
+async def websocket_endpoint(
+    socket: WebSocket,
+    token: Annotated[str, Depends(get_token_from_query)],
+    hall: Annotated[str | None, Query()] = None,
+    format: Annotated[str, Query()] = "json",
+):
+    if hall is not None and get_hall(hall) is None:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION)
+    if format not in OCCUPANCY_FORMATS:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION)
+
+    manager = get_manager(hall, format)
     await manager.connect(socket)
     user = await decode_access_token(token)
 
@@ -26,7 +39,7 @@ async def websocket_endpoint(socket: WebSocket, token: Annotated[str, Depends(ge
         raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION)
 
     try:
-        occupancy = await get_occupancy()
+        occupancy = await get_occupancy(hall, format)
         await manager.send_personal_message(occupancy, socket)
         while True:
             data = await socket.receive_text()
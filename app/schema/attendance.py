@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel
 
@@ -28,4 +28,17 @@ class DeleteAttendanceRequest(BaseModel):
     attendance_id: str
 
 class DeleteAttendanceResponse(BaseModel):
-    message: str
\ No newline at end of file
+    message: str
+
+class IdentifiedFace(BaseModel):
+    user_id: Optional[str] = None
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    email: Optional[str] = None
+    distance: Optional[float] = None
+    confidence: float
+    marked: bool
+
+class IdentifyAttendanceResponse(BaseModel):
+    message: str
+    faces: List[IdentifiedFace]
@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+
+
+class ReloadReferenceResponse(BaseModel):
+    message: str
+
+
+class HallOccupancyResponse(BaseModel):
+    hall_id: str
+    occupancy: dict[str, dict[str, int]]
+    analysis_fps: float
+    lag_seconds: float
+
+
+class SeatOrderResponse(BaseModel):
+    hall_id: str
+    seats: list[str]
@@ -0,0 +1,210 @@
+import asyncio
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import dlib
+import face_recognition
+import numpy as np
+from fastapi import HTTPException
+from fastapi.logger import logger
+
+from app.config import settings
+from app.core.face_image import crop_around, downscale, load_upload
+from app.core.metrics import Counter, Gauge, Histogram, registry
+
+# dlib's HOG detector and ResNet encoder hold the GIL for hundreds of
+# milliseconds per image, so encoding runs in a process pool. Admission is
+# bounded: past `face_workers + face_queue_size` jobs in flight new requests are
+# turned away with 429 instead of piling up behind a check-in rush.
+#
+# With `face_batch_window_ms` above 0, requests arriving within that window (up
+# to `face_batch_size` of them) go to a worker together, which detects faces per
+# image and then encodes all of them in one dlib call. Off by default: the batch
+# occupies one worker while others may idle, so it only pays off where the
+# face_batching benchmark shows it does.
+
+face_executor: ProcessPoolExecutor = None
+in_flight = 0
+mean_job_seconds = 0.5  # running estimate, seeds Retry-After before the first job
+
+face_jobs_rejected = registry.register(Counter(
+    "seat_sense_face_jobs_rejected_total", "Face encoding requests turned away with 429."
+))
+face_job_seconds = registry.register(Histogram(
+    "seat_sense_face_job_seconds", "Time from admission to encodings for one uploaded image."
+))
+face_batch_size = registry.register(Histogram(
+    "seat_sense_face_batch_size", "Images per face encoding batch.", buckets=(1, 2, 4, 8, 16, 32, 64)
+))
+
+def start_face_executor():
+    global face_executor
+    if face_executor is None:
+        face_executor = ProcessPoolExecutor(max_workers=settings.face_workers)
+
+def replace_broken_face_executor(executor: ProcessPoolExecutor):
+    # A worker killed by a segfault or the OOM killer breaks the whole pool for
+    # good; only the first batch to notice swaps in a new one
+    global face_executor
+    if executor is face_executor:
+        face_executor = ProcessPoolExecutor(max_workers=settings.face_workers)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def stop_face_executor():
+    global face_executor
+    if face_executor is not None:
+        face_executor.shutdown(wait=False, cancel_futures=True)
+        face_executor = None
+
+def queue_depth() -> int:
+    # Jobs admitted but not yet picked up by a worker
+    return max(in_flight - settings.face_workers, 0)
+
+def retry_after_seconds() -> int:
+    # Time for the workers to get through what is already admitted
+    return max(1, math.ceil(in_flight / settings.face_workers * mean_job_seconds))
+
+def face_crops(image_file: bytes, detect_max_side: int = None) -> list[tuple[np.ndarray, dlib.full_object_detection]]:
+    # Detect on a small copy, then crop each face out of the larger decode. A
+    # larger `detect_max_side` (kiosk frames) also raises the decode size.
+    detect_max_side = detect_max_side or settings.face_detect_max_side
+    image = load_upload(image_file, max(settings.face_decode_max_side, detect_max_side))
+    small, scale = downscale(image, detect_max_side)
+
+    crops = []
+    for location in face_recognition.face_locations(small, settings.face_detect_upsample):
+        crop, (top, right, bottom, left) = crop_around(image, location, scale, settings.face_crop_margin)
+        landmarks = face_recognition.api.pose_predictor_5_point(crop, dlib.rectangle(left, top, right, bottom))
+        crops.append((crop, landmarks))
+    return crops
+
+def face_encodings_from_uploads(image_files: list[bytes],
+                                detect_max_sides: list[int] = None) -> list[list[np.ndarray] | Exception]:
+    """Encodings of every face in each image, computed with one batched call to
+    the encoder. An image that fails gets its exception in place of encodings."""
+    prepared: list[list | Exception] = []
+    for image_file, detect_max_side in zip(image_files, detect_max_sides or [None] * len(image_files)):
+        try:
+            prepared.append(face_crops(image_file, detect_max_side))
+        except Exception as e:
+            prepared.append(e)
+
+    crops = [crop for faces in prepared if not isinstance(faces, Exception) for crop in faces]
+    descriptors = iter([])
+    if crops:
+        batch_faces = []
+        for _, landmarks in crops:
+            faces = dlib.full_object_detections()
+            faces.append(landmarks)
+            batch_faces.append(faces)
+        descriptors = iter(face_recognition.api.face_encoder.compute_face_descriptor(
+            [crop for crop, _ in crops], batch_faces, 1
+        ))
+
+    results = []
+    for faces in prepared:
+        if isinstance(faces, Exception):
+            results.append(faces)
+        else:
+            results.append([np.array(next(descriptors)[0]) for _ in faces])
+    return results
+
+def face_encodings_from_upload(image_file: bytes) -> list[np.ndarray]:
+    result = face_encodings_from_uploads([image_file])[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+class FaceBatcher:
+    """Collects encoding jobs on the event loop and hands them to the worker
+    pool in batches, closing a batch after `window` seconds or `max_size` jobs."""
+
+    def __init__(self, window: float, max_size: int):
+        self.window = window
+        self.max_size = max_size
+        self.pending: list[tuple[bytes, int, asyncio.Future]] = []
+        self.flush_handle: asyncio.TimerHandle = None
+
+    async def submit(self, image_file: bytes, detect_max_side: int = None) -> list[np.ndarray]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((image_file, detect_max_side, future))
+
+        if len(self.pending) >= self.max_size or self.window <= 0:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.window, self.flush)
+        return await future
+
+    def flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        batch, self.pending = self.pending, []
+        if batch:
+            asyncio.create_task(self._run(batch))
+
+    async def _run(self, batch: list[tuple[bytes, int, asyncio.Future]]):
+        face_batch_size.observe(len(batch))
+        executor = face_executor
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                executor, face_encodings_from_uploads,
+                [image_file for image_file, _, _ in batch], [detect_max_side for _, detect_max_side, _ in batch],
+            )
+        except BrokenProcessPool as e:
+            # Only the batches in flight on the dead pool fail; later ones get a new pool
+            logger.error(f"Face encoding worker died, starting a new pool: {e}")
+            replace_broken_face_executor(executor)
+            results = [e] * len(batch)
+        except Exception as e:
+            results = [e] * len(batch)
+
+        for (_, _, future), result in zip(batch, results):
+            if future.done():
+                continue  # The request went away while waiting
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+face_batcher = FaceBatcher(settings.face_batch_window_ms / 1000, settings.face_batch_size)
+
+async def encode_faces(image_file: bytes, detect_max_side: int = None) -> list[np.ndarray]:
+    """Face encodings of an uploaded image, computed in the face worker pool.
+    Faces are searched for at up to `detect_max_side` pixels, by default
+    `face_detect_max_side`.
+
+    Raises HTTPException 429 with a Retry-After header when the pool is saturated.
+    """
+    global in_flight, mean_job_seconds
+
+    if in_flight >= settings.face_workers + settings.face_queue_size:
+        face_jobs_rejected.inc()
+        raise HTTPException(
+            status_code=429,
+            detail="Face recognition is busy, please retry",
+            headers={"Retry-After": str(retry_after_seconds())},
+        )
+
+    start_face_executor()
+    in_flight += 1
+    start = time.perf_counter()
+    try:
+        return await face_batcher.submit(image_file, detect_max_side)
+    finally:
+        in_flight -= 1
+        elapsed = time.perf_counter() - start
+        face_job_seconds.observe(elapsed)
+        mean_job_seconds += 0.1 * (elapsed - mean_job_seconds)
+
+registry.register(Gauge(
+    "seat_sense_face_queue_depth", "Face encoding jobs waiting for a worker.", (),
+    lambda: [((), queue_depth())],
+))
+registry.register(Gauge(
+    "seat_sense_face_jobs_in_flight", "Face encoding jobs admitted and not yet finished.", (),
+    lambda: [((), in_flight)],
+))
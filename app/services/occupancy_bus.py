@@ -0,0 +1,181 @@
+import asyncio
+import json
+import os
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable
+
+import asyncpg
+from fastapi.logger import logger
+
+from app.config import settings
+
+# Lets several uvicorn workers share one detection pipeline: the worker that wins
+# leadership runs detection and publishes every change on the bus, the others
+# only apply what they receive to their own websocket clients.
+
+OnMessage = Callable[[str, dict[str, bool]], Awaitable[None]]
+
+def encode_bus_message(hall_id: str, occupancy: dict[str, bool]) -> str:
+    return json.dumps({"hall_id": hall_id, "occupancy": occupancy}, separators=(",", ":"))
+
+def decode_bus_message(message: str) -> tuple[str, dict[str, bool]]:
+    data = json.loads(message)
+    return data["hall_id"], data["occupancy"]
+
+class OccupancyBus(ABC):
+    @abstractmethod
+    async def start(self, on_message: OnMessage):
+        """Start receiving occupancy published by the leader."""
+
+    @abstractmethod
+    async def try_lead(self) -> bool:
+        """Try to become the single producer; never blocks."""
+
+    @abstractmethod
+    async def check(self):
+        """Raise if a follower no longer receives what the leader publishes."""
+
+    @abstractmethod
+    async def publish(self, hall_id: str, occupancy: dict[str, bool]):
+        """Send occupancy to the followers; raises if leadership was lost."""
+
+    @abstractmethod
+    async def close(self):
+        """Release leadership and connections; safe on a half-started bus."""
+
+class LocalOccupancyBus(OccupancyBus):
+    """Workers on one host: leadership is an flock on a lock file, and the leader
+    streams newline-delimited JSON to subscribers over a Unix socket."""
+
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self.lock_file = None
+        self.server: asyncio.AbstractServer = None
+        self.writers: set[asyncio.StreamWriter] = set()
+        self.listener: asyncio.Task = None
+        self.last_messages: dict[str, str] = {}
+
+    async def start(self, on_message: OnMessage):
+        self.listener = asyncio.create_task(self._listen(on_message))
+
+    async def _listen(self, on_message: OnMessage):
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.socket_path)
+                try:
+                    while line := await reader.readline():
+                        await on_message(*decode_bus_message(line.decode()))
+                finally:
+                    writer.close()
+            except (ConnectionError, FileNotFoundError):
+                pass  # No leader yet, or it went away
+            except Exception as e:
+                logger.error(f"Error reading occupancy bus: {e}")
+            await asyncio.sleep(settings.occupancy_bus_retry_interval)
+
+    async def try_lead(self) -> bool:
+        import fcntl  # POSIX only, like the Unix socket itself
+
+        lock_file = open(self.socket_path + ".lock", "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+
+        # Held until this process exits, so a crashed leader frees it
+        self.lock_file = lock_file
+        if self.listener is not None:
+            self.listener.cancel()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.server = await asyncio.start_unix_server(self._on_subscriber, self.socket_path)
+        return True
+
+    async def check(self):
+        # The listener reconnects by itself and only ends if something broke it
+        if self.listener is not None and self.listener.done():
+            raise ConnectionError("Occupancy bus listener stopped")
+
+    async def _on_subscriber(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # Bring the new worker up to date right away
+        for message in self.last_messages.values():
+            writer.write(message.encode() + b"\n")
+        self.writers.add(writer)
+
+    async def publish(self, hall_id: str, occupancy: dict[str, bool]):
+        message = encode_bus_message(hall_id, occupancy)
+        self.last_messages[hall_id] = message
+
+        data = message.encode() + b"\n"
+        for writer in list(self.writers):
+            if writer.is_closing():
+                self.writers.discard(writer)
+                continue
+            writer.write(data)
+
+    async def close(self):
+        if self.listener is not None:
+            self.listener.cancel()
+        for writer in self.writers:
+            writer.close()
+        if self.server is not None:
+            self.server.close()
+        if self.lock_file is not None:
+            self.lock_file.close()
+
+class PostgresOccupancyBus(OccupancyBus):
+    """Workers on any host sharing the database: leadership is a session-level
+    advisory lock and occupancy travels over LISTEN/NOTIFY."""
+
+    CHANNEL = "occupancy"
+    LOCK_KEY = 0x5EA75E45
+
+    def __init__(self, database_url: str):
+        # asyncpg takes a plain postgresql:// URL
+        self.database_url = database_url.replace("postgresql+asyncpg://", "postgresql://")
+        self.listen_connection = None
+        self.lead_connection = None
+        self.on_message: OnMessage = None
+
+    async def start(self, on_message: OnMessage):
+        self.on_message = on_message
+        self.listen_connection = await asyncpg.connect(self.database_url)
+        await self.listen_connection.add_listener(self.CHANNEL, self._on_notify)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        asyncio.create_task(self.on_message(*decode_bus_message(payload)))
+
+    async def try_lead(self) -> bool:
+        if self.lead_connection is None:
+            self.lead_connection = await asyncpg.connect(self.database_url)
+
+        # Released by the server when the leader's connection drops
+        if not await self.lead_connection.fetchval("SELECT pg_try_advisory_lock($1)", self.LOCK_KEY):
+            return False
+
+        await self.listen_connection.remove_listener(self.CHANNEL, self._on_notify)
+        return True
+
+    async def check(self):
+        # A dropped LISTEN connection just stops delivering, so probe it
+        if self.listen_connection is None or self.listen_connection.is_closed():
+            raise ConnectionError("Occupancy bus listen connection is closed")
+        await self.listen_connection.execute("SELECT 1")
+
+    async def publish(self, hall_id: str, occupancy: dict[str, bool]):
+        # NOTIFY payloads are capped at 8000 bytes, roughly 500 seats per hall
+        message = encode_bus_message(hall_id, occupancy)
+        await self.lead_connection.execute("SELECT pg_notify($1, $2)", self.CHANNEL, message)
+
+    async def close(self):
+        for connection in (self.listen_connection, self.lead_connection):
+            if connection is not None and not connection.is_closed():
+                await connection.close()
+
+def create_occupancy_bus() -> OccupancyBus:
+    if settings.occupancy_bus == "local":
+        return LocalOccupancyBus(settings.occupancy_bus_socket)
+    if settings.occupancy_bus == "postgres":
+        return PostgresOccupancyBus(settings.async_database_url)
+    return None
@@ -1,114 +1,483 @@
 import asyncio
 import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 import cv2
 import numpy as np
 from fastapi.logger import logger
 
 from app.config import settings
-from app.core.connection_manager import manager
-from app.core.image_processing import (compute_ssim, edge_detection_roi,
-                                       orb_align_image)
+from app.core.connection_manager import get_manager
+from app.core.frame_sampler import FrameSampler
+from app.core.hall_config import HallConfig, get_hall, halls
+from app.core.image_processing import (FeatureMatcher, HomographyEstimator,
+                                       HomographyTracker, compute_ssim,
+                                       compute_ssim_batch, edge_density_batch,
+                                       edge_detection_roi, orb_align_image,
+                                       roi_change_scores)
+from app.core.metrics import (alignment_paths, drain_worker_metrics,
+                              frames_dropped, frames_processed,
+                              merge_worker_metrics, stage_seconds)
+from app.core.occupancy_feed import OccupancyFeed, encode_message
+from app.core.occupancy_state import SharedOccupancyState
+from app.core.reference_scene import ReferenceScene
 from app.core.seat_labels import bounding_boxes
+from app.services.occupancy_bus import OccupancyBus, create_occupancy_bus
 
 occupancy_data = {}
+occupancy_by_hall: dict[str, dict] = {}
+occupancy_feeds: dict[str, OccupancyFeed] = {}
+occupancy_bus: OccupancyBus = None  # set while this worker is the detection leader
+shared_states: dict[str, SharedOccupancyState] = {}
+hall_samplers: dict[str, FrameSampler] = {}
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-async def get_occupancy():
+# Detection runs in worker processes so ORB, SSIM and Canny never block the event
+# loop. Each hall is pinned to one single-process executor, which keeps its cached
+# reference scene and homography in one place, and the halls are spread over a
+# bounded number of those executors.
+occupancy_executors: list[ProcessPoolExecutor] = []
+
+def create_occupancy_executor() -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=1, initializer=drain_worker_metrics)
+
+def start_occupancy_executor():
+    if not occupancy_executors:
+        workers = max(1, min(settings.occupancy_workers, len(halls)))
+        occupancy_executors.extend(create_occupancy_executor() for _ in range(workers))
+
+def replace_broken_executor(executor: ProcessPoolExecutor):
+    # A worker killed by a crash or the OOM killer breaks its executor for good, so
+    # swap in a fresh one (its halls rebuild their detectors on the next frame).
+    # Several halls can hit the same broken executor; only the first replaces it.
+    if executor in occupancy_executors:
+        occupancy_executors[occupancy_executors.index(executor)] = create_occupancy_executor()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def stop_occupancy_executor():
+    for executor in occupancy_executors:
+        executor.shutdown(wait=False, cancel_futures=True)
+    occupancy_executors.clear()
+
+def executor_for(hall_id: str) -> ProcessPoolExecutor:
+    start_occupancy_executor()
+    hall_ids = [hall.hall_id for hall in halls]
+    index = hall_ids.index(hall_id) if hall_id in hall_ids else 0
+    return occupancy_executors[index % len(occupancy_executors)]
+
+async def collect_worker_metrics():
+    # Pulled from the workers only when /metrics is scraped; never starts them.
+    # Each worker drains on start too, since a forked worker inherits the
+    # parent's observations and should only report its own.
+    loop = asyncio.get_running_loop()
+    for executor in list(occupancy_executors):
+        try:
+            merge_worker_metrics(await loop.run_in_executor(executor, drain_worker_metrics))
+        except BrokenProcessPool:
+            replace_broken_executor(executor)
+
+async def run_in_occupancy_executor(fn, *args, hall_id: str = settings.default_hall_id):
+    """Run `fn` in the hall's worker process. If that worker died, its executor is
+    replaced before BrokenProcessPool is raised, so the next call goes to a new one."""
+    executor = executor_for(hall_id)
+    try:
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+    except BrokenProcessPool:
+        logger.error(f"Occupancy worker for hall {hall_id} died, starting a new one")
+        replace_broken_executor(executor)
+        raise
+
+def create_homography_estimator() -> HomographyEstimator:
+    matcher = FeatureMatcher(settings.align_matcher, settings.align_match_ratio, settings.align_max_matches)
+    return HomographyEstimator(settings.align_downscale, settings.align_features,
+                               settings.align_min_inlier_ratio, settings.align_min_inliers, matcher)
+
+class HallDetector:
+    """Per-hall detection state that lives inside a worker process."""
+
+    def __init__(self, hall: HallConfig):
+        self.hall = hall
+        self.reference_scene = ReferenceScene(hall.resolve(hall.reference_image_path))
+        self.homography_estimator = create_homography_estimator()
+        self.homography_tracker = HomographyTracker(settings.homography_drift_threshold,
+                                                    estimator=self.homography_estimator)
+        self.layout = hall.seat_layout()
+        self.bounding_boxes = self.layout.bounding_boxes
+        # Frame as of each seat's last scoring, the reference it was scored
+        # against, and the states it produced
+        self.scored_gray: np.ndarray = None
+        self.scored_reference: np.ndarray = None
+        self.occupancy: dict[str, bool] = None
+        self.frames_since_full_score = 0
+        self.scored_seats = 0
+        self.seen_seats = 0
+
+    def detect(self, filled_gray: np.ndarray) -> dict[str, bool] | None:
+        if filled_gray.ndim == 3:
+            filled_gray = cv2.cvtColor(filled_gray, cv2.COLOR_BGR2GRAY)
+
+        # Cached reference image and ORB features, reloaded only when the file changes
+        scene = self.reference_scene.get()
+        with stage_seconds.time("align"):
+            aligned_filled_gray = self.homography_tracker.align(scene.gray, filled_gray, scene.features,
+                                                                reuse=settings.reuse_homography)
+        alignment_paths.inc(self.hall.hall_id, self.homography_tracker.last_path)
+        if aligned_filled_gray is None:
+            return None  # Could not be aligned at all; skip the frame
+
+        # States judged against a reference that has since been reloaded (by an
+        # admin or because the file changed on disk) are all scored again
+        if self.occupancy is None or scene.gray is not self.scored_reference \
+        or self.scored_gray.shape != aligned_filled_gray.shape \
+        or self.frames_since_full_score >= settings.full_rescore_interval:
+            changed_boxes = self.bounding_boxes
+            self.scored_gray = aligned_filled_gray.copy()
+            self.scored_reference = scene.gray
+            self.occupancy = {}
+            self.frames_since_full_score = 0
+        else:
+            # Only seats whose pixels moved since they were last scored go through
+            # the edge and SSIM test; the rest keep their previous state
+            change_scores = roi_change_scores(self.scored_gray, aligned_filled_gray, self.layout.boxes)
+            changed_boxes = {
+                self.layout.labels[i]: self.bounding_boxes[self.layout.labels[i]]
+                for i in np.flatnonzero(change_scores > settings.seat_change_threshold)
+            }
+            for x, y, w, h in changed_boxes.values():
+                self.scored_gray[y:y+h, x:x+w] = aligned_filled_gray[y:y+h, x:x+w]
+            self.frames_since_full_score += 1
+
+        self.occupancy.update(classify_seats(scene.gray, aligned_filled_gray, changed_boxes,
+                                             self.hall.edge_threshold, self.hall.ssim_threshold))
+        self.scored_seats += len(changed_boxes)
+        self.seen_seats += len(self.bounding_boxes)
+
+        return dict(self.occupancy)
+
+    def reload(self):
+        self.reference_scene.reload()
+        self.homography_tracker.reset()
+        self.occupancy = None
+
+    @property
+    def rescore_rate(self) -> float:
+        return self.scored_seats / self.seen_seats if self.seen_seats else 0.0
+
+# Detectors of the halls pinned to the current worker process
+hall_detectors: dict[str, HallDetector] = {}
+
+def get_hall_detector(hall: HallConfig) -> HallDetector:
+    detector = hall_detectors.get(hall.hall_id)
+    if detector is None or detector.hall != hall:
+        detector = hall_detectors[hall.hall_id] = HallDetector(hall)
+    return detector
+
+def detect_hall_occupancy(hall: HallConfig, filled_gray: np.ndarray) -> dict[str, bool] | None:
+    try:
+        return get_hall_detector(hall).detect(filled_gray)
+    except Exception as e:
+        logger.error(f"Error during occupancy detection for hall {hall.hall_id}: {e}")
+
+def _reload_reference_scene(hall: HallConfig):
+    get_hall_detector(hall).reload()
+
+def _detector_stats(hall: HallConfig) -> tuple[int, int, float, float, dict[str, int]]:
+    detector = get_hall_detector(hall)
+    tracker = detector.homography_tracker
+    return tracker.reestimations, tracker.frames, tracker.reestimation_rate, detector.rescore_rate, tracker.paths
+
+async def reload_reference_scene(hall_id: str = None):
+    for hall in halls:
+        if hall_id is None or hall.hall_id == hall_id:
+            await run_in_occupancy_executor(_reload_reference_scene, hall, hall_id=hall.hall_id)
+
+async def get_occupancy(hall_id: str = None, format: str = "json") -> str | bytes:
+    return get_feed(hall_id or settings.default_hall_id).encoded_snapshot(format)
+
+def get_feed(hall_id: str) -> OccupancyFeed:
+    if hall_id not in occupancy_feeds:
+        hall = get_hall(hall_id)
+        occupancy_feeds[hall_id] = OccupancyFeed(hall_id, hall.seat_layout() if hall else None)
+    return occupancy_feeds[hall_id]
+
+def get_shared_state(hall_id: str, create: bool = False) -> SharedOccupancyState:
+    state = shared_states.get(hall_id)
+    if state is not None and not state.stale:
+        return state
+
+    hall = get_hall(hall_id)
+    if hall is None:
+        return None
+
+    labels = hall.seat_layout().labels
+    name = SharedOccupancyState.segment_name(hall_id, settings.shared_occupancy_prefix)
+    if create:
+        state = SharedOccupancyState.create(name, labels)
+    else:
+        state = SharedOccupancyState.attach(name, labels)
+
+    if state is not None:
+        shared_states[hall_id] = state
+    return state
+
+def shared_occupancy_enabled() -> bool:
+    # The segment's seqlock allows a single writer, the bus leader. Without a bus
+    # every worker runs its own detection and serves its own state instead.
+    return settings.shared_occupancy and settings.occupancy_bus in ("local", "postgres")
+
+def get_hall_occupancy(hall_id: str) -> dict[str, dict[str, bool]]:
+    # Read straight from shared memory when enabled, so any worker on the host
+    # sees the leader's latest state without waiting for the bus
+    if shared_occupancy_enabled():
+        state = get_shared_state(hall_id)
+        occupancy = state.to_dict() if state is not None else None
+        if occupancy is not None:
+            return get_hall(hall_id).seat_layout().group(occupancy)
+    return occupancy_by_hall.get(hall_id, {})
+
+async def publish_occupancy(hall_id: str, occupancy: dict[str, bool] | None):
+    # None is a frame detection gave up on; the last published state stands
+    if occupancy is None or not await apply_occupancy(hall_id, occupancy):
+        return
+
+    if occupancy_bus is not None:
+        # Only the leader gets here, so the segment has a single writer
+        if shared_occupancy_enabled():
+            get_shared_state(hall_id, create=True).write(occupancy)
+
+        # Other workers pick the change up from the bus
+        await occupancy_bus.publish(hall_id, occupancy)
+
+async def apply_occupancy(hall_id: str, occupancy: dict[str, bool]) -> bool:
     global occupancy_data
-    return str(occupancy_data)
 
-VIDEO_PATH = os.path.join(BASE_DIR, 'static/video.mp4')
+    feed = get_feed(hall_id)
+    delta = feed.update(occupancy)
+    if delta is None:
+        return False  # Nothing flipped, nothing to send
+
+    occupancy_by_hall[hall_id] = feed.grouped
+    if hall_id == settings.default_hall_id:
+        occupancy_data = feed.grouped
+
+    # Each payload is encoded once and the same buffer goes to every subscriber.
+    # JSON clients that fall behind get a fresh snapshot instead of a backlog of
+    # deltas; bitset clients always receive the full state, it is only a few bytes.
+    await get_manager(hall_id, "json").broadcast(encode_message(delta), lambda: feed.encoded_snapshot("json"))
+
+    bitset = feed.encoded_snapshot("bitset")
+    await get_manager(hall_id, "bitset").broadcast(bitset, lambda: bitset)
+    return True
+
+async def run_occupancy_service():
+    # Without a bus this process simply runs detection itself
+    bus = create_occupancy_bus()
+    if bus is None:
+        if settings.shared_occupancy:
+            logger.warning("SHARED_OCCUPANCY needs OCCUPANCY_BUS to pick a single writer; ignoring it")
+        # Nothing to hand over to, so each hall restarts on its own after an error
+        await asyncio.gather(*(watch_hall(hall) for hall in halls))
+        return
+
+    # A bus that fails (database unreachable, a dropped connection, a publish
+    # that no longer reaches anyone) is torn down and the worker starts over as
+    # a follower; it may well win leadership again
+    global occupancy_bus
+    while True:
+        try:
+            await follow_or_lead(bus)
+        except Exception as e:
+            logger.error(f"Occupancy bus failed in worker {os.getpid()}, reconnecting: {e}")
+        finally:
+            occupancy_bus = None
+            try:
+                await bus.close()
+            except Exception as e:
+                logger.error(f"Error closing occupancy bus: {e}")
+        await asyncio.sleep(settings.occupancy_bus_retry_interval)
+        bus = create_occupancy_bus()
+
+async def follow_or_lead(bus: OccupancyBus):
+    global occupancy_bus
+
+    await bus.start(apply_occupancy)
+    while not await bus.try_lead():
+        await bus.check()
+        await asyncio.sleep(settings.occupancy_bus_retry_interval)
+
+    logger.info(f"Worker {os.getpid()} runs occupancy detection for all workers")
+    occupancy_bus = bus
+    await run_until_first_error(process_video_on_loop(), resync_occupancy_bus(bus))
+
+async def run_until_first_error(*coros):
+    # Unlike a bare gather, the others are cancelled as soon as one fails, so a
+    # worker that lost leadership stops detecting
+    tasks = [asyncio.create_task(coro) for coro in coros]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def resync_occupancy_bus(bus: OccupancyBus):
+    # Periodically republish full state so workers that joined late catch up
+    while True:
+        await asyncio.sleep(settings.occupancy_bus_resync_interval)
+        for hall_id, feed in list(occupancy_feeds.items()):
+            await bus.publish(hall_id, feed.seats)
 
 async def process_video_on_loop():
-    global occupancy_data
+    # The leader's loops, one per hall, meeting only in the worker pool. A failure
+    # in any of them ends leadership and the bus loop logs it and starts over.
+    await run_until_first_error(*(process_hall_video_on_loop(hall) for hall in halls))
+
+async def watch_hall(hall: HallConfig):
+    while True:
+        try:
+            await process_hall_video_on_loop(hall)
+        except Exception as e:
+            logger.error(f"Occupancy detection for hall {hall.hall_id} failed, restarting: {e}")
+        await asyncio.sleep(2)
+
+async def process_hall_video_on_loop(hall: HallConfig):
+    video_path = hall.resolve(hall.video_path)
 
     while True:
-        cap = cv2.VideoCapture(VIDEO_PATH)
+        cap = cv2.VideoCapture(video_path)
         
         if not cap.isOpened():
-            logger.error(f"Failed to open video file at {VIDEO_PATH}")
+            logger.error(f"Failed to open video file at {video_path}")
             await asyncio.sleep(2)
             continue
 
+        sampler = hall_samplers[hall.hall_id] = FrameSampler(
+            cap, settings.analysis_fps, settings.sampler_seek_threshold_frames
+        )
+
         while cap.isOpened():
-            ret, frame = cap.read()
+            # Decode off the event loop as well
+            skipped = sampler.skipped
+            ret, gray_frame = await asyncio.to_thread(read_gray_frame, sampler)
+            if sampler.skipped > skipped:
+                frames_dropped.inc(hall.hall_id, "skipped", amount=sampler.skipped - skipped)
             if not ret:
                 break  # End of video reached; restart loop
 
-            # Convert frame to grayscale and save temporarily for processing
-            temp_frame_path = os.path.join(BASE_DIR, 'static/temp_frame.png')
-            # gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            cv2.imwrite(temp_frame_path, frame)
-
-            # Run your existing occupancy detection logic
-            occupancy = compute_occupancy(temp_frame_path)
-
-            # Group and sort occupancy data
-            grouped_sorted_occupancy_data = {}
-            for seat, status in occupancy.items():
-                row = seat[0]
-                seat_number = seat[1:]
-                if row not in grouped_sorted_occupancy_data:
-                    grouped_sorted_occupancy_data[row] = {}
-                grouped_sorted_occupancy_data[row][seat_number] = status
-
-            occupancy_data = {
-                row: dict(sorted(seats.items(), key=lambda x: int(x[0])))
-                for row, seats in sorted(grouped_sorted_occupancy_data.items())
-            }
+            # Run your existing occupancy detection logic in the hall's worker process
+            try:
+                occupancy = await run_in_occupancy_executor(detect_hall_occupancy, hall, gray_frame,
+                                                            hall_id=hall.hall_id)
+            except BrokenProcessPool:
+                occupancy = None  # The frame went down with the worker
+            if occupancy is None:
+                frames_dropped.inc(hall.hall_id, "failed")
+            else:
+                frames_processed.inc(hall.hall_id)
 
-            await manager.broadcast(str(occupancy_data))
-            await asyncio.sleep(2)
+            await publish_occupancy(hall.hall_id, occupancy)
+            await asyncio.sleep(sampler.delay())
 
         cap.release()
+        logger.info(f"Hall {hall.hall_id}: analysed {sampler.samples} frames at {sampler.effective_fps:.2f} fps, "
+                    f"skipped {sampler.skipped}, {sampler.lag:.1f}s behind the source")
+        try:
+            reestimations, frames, rate, rescore_rate, paths = await run_in_occupancy_executor(
+                _detector_stats, hall, hall_id=hall.hall_id
+            )
+        except BrokenProcessPool:
+            await asyncio.sleep(1)
+            continue
+        logger.info(f"Hall {hall.hall_id}: homography re-estimated {reestimations} times "
+                    f"over {frames} frames ({rate:.1%}), {rescore_rate:.1%} of seats re-scored; "
+                    f"aligned with last good homography {paths['last_good']}, ECC {paths['ecc']}, "
+                    f"skipped {paths['skipped']}")
         await asyncio.sleep(1)  # Wait before restarting the video
 
 async def compute_occupancy_periodically():
-    global occupancy_data
     while True:
-        occupancy = compute_occupancy(os.path.join(BASE_DIR, f"static/{np.random.randint(1, 7)}.png"))
-        # Group and sort the occupancy data by row and seat number in one step
-        grouped_sorted_occupancy_data = {}
-        for seat, status in occupancy.items():
-            row = seat[0]  # Extract the row label (e.g., 'A', 'B', etc.)
-            seat_number = seat[1:]  # Extract the seat number as a string
-            if row not in grouped_sorted_occupancy_data:
-                grouped_sorted_occupancy_data[row] = {}
-            grouped_sorted_occupancy_data[row][seat_number] = status
-
-        # Sort rows alphabetically and seat numbers numerically
-        occupancy_data = {
-            row: dict(sorted(seats.items(), key=lambda x: int(x[0])))  # Sort seat numbers numerically
-            for row, seats in sorted(grouped_sorted_occupancy_data.items())  # Sort rows alphabetically
-        }
-
-        await manager.broadcast(str(occupancy_data))
+        occupancy = await run_in_occupancy_executor(
+            compute_occupancy, os.path.join(BASE_DIR, f"static/{np.random.randint(1, 7)}.png")
+        )
+        await publish_occupancy(settings.default_hall_id, occupancy)
         await asyncio.sleep(2)
 
-def compute_occupancy(filled_image_path: np.ndarray, empty_image_path: np.ndarray = None) -> dict[str, bool]:
-    try:
-        if empty_image_path is None:
-            empty_gray = cv2.imread(os.path.join(BASE_DIR, "static/empty-auditorium.png"), cv2.IMREAD_GRAYSCALE)
-        else:
-            empty_gray = cv2.imread(empty_image_path, cv2.IMREAD_GRAYSCALE)
+def read_gray_frame(cap: cv2.VideoCapture | FrameSampler) -> tuple[bool, np.ndarray]:
+    ret, frame = cap.read()
+    if not ret:
+        return False, None
+    return True, cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
 
-        filled_gray = cv2.imread(filled_image_path, cv2.IMREAD_GRAYSCALE)
-        aligned_filled_gray = orb_align_image(empty_gray, filled_gray)
+def compute_occupancy(filled_image_path: str, empty_image_path: str = None) -> dict[str, bool]:
+    filled_gray = cv2.imread(filled_image_path, cv2.IMREAD_GRAYSCALE)
+    empty_gray = None if empty_image_path is None else cv2.imread(empty_image_path, cv2.IMREAD_GRAYSCALE)
 
-        occupancy: dict[str, bool] = {}
+    return compute_occupancy_from_frame(filled_gray, empty_gray)
 
-        for label, (x, y, w, h) in bounding_boxes.items():
-            region = aligned_filled_gray[y:y+h, x:x+w]
-            edges = edge_detection_roi(region, 0, 0, w, h)
+def compute_occupancy_from_frame(filled_gray: np.ndarray, empty_gray: np.ndarray = None) -> dict[str, bool]:
+    if empty_gray is None:
+        return detect_hall_occupancy(get_hall() or halls[0], filled_gray)
 
-            if np.mean(edges) > settings.edge_threshold \
-            and compute_ssim(empty_gray, aligned_filled_gray, x, y, w, h) < settings.ssim_threshold:
-                occupancy[label] = 1
-            else:
-                occupancy[label] = 0
+    try:
+        if filled_gray.ndim == 3:
+            filled_gray = cv2.cvtColor(filled_gray, cv2.COLOR_BGR2GRAY)
 
-        return occupancy
+        with stage_seconds.time("align"):
+            aligned_filled_gray = orb_align_image(empty_gray, filled_gray)
+
+        return classify_seats(empty_gray, aligned_filled_gray, bounding_boxes,
+                              settings.edge_threshold, settings.ssim_threshold)
 
     except Exception as e:
-        logger.error(f"Error during occupancy detection: {e}")
\ No newline at end of file
+        logger.error(f"Error during occupancy detection: {e}")
+
+def classify_seats(
+    empty_gray: np.ndarray,
+    aligned_filled_gray: np.ndarray,
+    bounding_boxes: dict[str, list[int]],
+    edge_threshold: float,
+    ssim_threshold: float,
+) -> dict[str, bool]:
+    occupancy: dict[str, bool] = {}
+    candidates = {}
+
+    with stage_seconds.time("edges"):
+        edge_means = seat_edge_means(aligned_filled_gray, bounding_boxes)
+    for label, edge_mean in edge_means.items():
+        occupancy[label] = 0
+        if edge_mean > edge_threshold:
+            candidates[label] = bounding_boxes[label]
+
+    with stage_seconds.time("ssim"):
+        ssim_scores = seat_ssim_scores(empty_gray, aligned_filled_gray, candidates)
+    for label, score in ssim_scores.items():
+        if score < ssim_threshold:
+            occupancy[label] = 1
+
+    return occupancy
+
+def seat_edge_means(aligned_filled_gray: np.ndarray, bounding_boxes: dict[str, list[int]]) -> dict[str, float]:
+    if settings.whole_frame_edges:
+        return edge_density_batch(aligned_filled_gray, bounding_boxes)
+
+    edge_means = {}
+    for label, (x, y, w, h) in bounding_boxes.items():
+        region = aligned_filled_gray[y:y+h, x:x+w]
+        edges = edge_detection_roi(region, 0, 0, w, h)
+        edge_means[label] = np.mean(edges)
+    return edge_means
+
+def seat_ssim_scores(
+    empty_gray: np.ndarray,
+    aligned_filled_gray: np.ndarray,
+    bounding_boxes: dict[str, list[int]],
+) -> dict[str, float]:
+    # Batched SSIM has a fixed per-frame cost, so it only pays off once enough
+    # seats pass the edge test; below that, score each candidate on its own
+    if len(bounding_boxes) >= settings.ssim_batch_min_seats:
+        return compute_ssim_batch(empty_gray, aligned_filled_gray, bounding_boxes)
+
+    return {
+        label: compute_ssim(empty_gray, aligned_filled_gray, x, y, w, h)
+        for label, (x, y, w, h) in bounding_boxes.items()
+    }
@@ -0,0 +1,23 @@
+import asyncio
+
+from app.core.hall_config import halls
+from app.core.occupancy_feed import OccupancyFeed
+from app.core.token_manager import UserTokenModel
+from app.routers.occupancy import list_hall_occupancy
+from app.services import occupancy_detection
+
+USER = UserTokenModel(user_id="1", email="student@example.com", role="student",
+                      first_name="Test", last_name="Student", face_verified=True)
+
+def test_list_hall_occupancy_returns_every_hall(monkeypatch):
+    hall = halls[0]
+    feed = OccupancyFeed(hall.hall_id, hall.seat_layout())
+    feed.update({label: label == hall.seat_layout().labels[0] for label in hall.seat_layout().labels})
+    monkeypatch.setitem(occupancy_detection.occupancy_by_hall, hall.hall_id, feed.grouped)
+    monkeypatch.setattr(occupancy_detection.settings, "shared_occupancy", False)
+
+    responses = asyncio.run(list_hall_occupancy(user=USER))
+
+    assert [response.hall_id for response in responses] == [hall.hall_id for hall in halls]
+    assert responses[0].occupancy == feed.grouped
+    assert responses[0].analysis_fps == 0.0
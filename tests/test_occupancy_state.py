@@ -0,0 +1,25 @@
+import os
+from multiprocessing import shared_memory
+
+from app.core.occupancy_state import SharedOccupancyState
+
+LABELS = ["A1", "A2", "B1"]
+
+def test_reused_segment_recovers_from_a_torn_write():
+    name = f"seat-sense-test-{os.getpid()}"
+    writer = SharedOccupancyState.create(name, LABELS)
+    try:
+        writer.write({"A1": True})
+        writer.header[0] += 1  # the writer dies halfway through its next write
+        assert writer.read() is None
+
+        new_writer = SharedOccupancyState.create(name, LABELS)
+        assert new_writer.header[0] % 2 == 0
+        assert new_writer.to_dict() == {"A1": 1, "A2": 0, "B1": 0}
+        new_writer.close()
+    finally:
+        writer.close()
+        # Attached without untracking, so unlink also clears the tracker entry
+        leftover = shared_memory.SharedMemory(name=name)
+        leftover.close()
+        leftover.unlink()